@@ -0,0 +1,251 @@
+"""
+Асинхронные GET-обработчики для работы под ASGI (ASYNC_VIEWS=1).
+
+Читают данные через async ORM, поэтому один воркер обслуживает много
+медленных клиентов одновременно. Аутентификация, фильтры, пагинация и
+формат ответа совпадают с DRF-вьюсетами; запросы с другими методами
+передаются синхронным вьюсетам.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, redirect
+from django_filters.utils import translate_validation
+from rest_framework import exceptions, status
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from recipes.models import Recipe
+from users.models import User
+from . import events
+from .filters import RecipeQueryFilter
+from .pagination import CustomPagePagination
+from .renderers import FastJSONRenderer
+from .representations import arecipes_data, cached_recipe, recipe_columns
+from .utils import (search_ingredients, shopping_cart_ingredients,
+                    shopping_cart_line, short_link_recipe_id)
+from .views import (IngredientViewSet, RecipeViewSet, query_recipe_ids,
+                    uses_recipe_cache)
+
+
+def _render(data, status=status.HTTP_200_OK, headers=None):
+    response = HttpResponse(
+        FastJSONRenderer().render(data),
+        content_type=FastJSONRenderer.media_type,
+        status=status,
+        headers=headers
+    )
+    response['Vary'] = 'Accept'
+    return response
+
+
+def _handle_exception(request, exc):
+    """То же, что APIView.handle_exception."""
+    if isinstance(exc, (exceptions.NotAuthenticated,
+                        exceptions.AuthenticationFailed)):
+        auth_header = None
+        if request.authenticators:
+            auth_header = request.authenticators[0].authenticate_header(
+                request
+            )
+        if auth_header:
+            exc.auth_header = auth_header
+        else:
+            exc.status_code = status.HTTP_403_FORBIDDEN
+
+    response = api_settings.EXCEPTION_HANDLER(exc, {'request': request})
+    if response is None:
+        raise exc
+
+    headers = {}
+    if getattr(exc, 'auth_header', None):
+        headers['WWW-Authenticate'] = exc.auth_header
+    return _render(response.data, response.status_code, headers)
+
+
+def async_read_view(fallback=None):
+    """
+    Асинхронный GET/HEAD с аутентификацией из DEFAULT_AUTHENTICATION_CLASSES.
+
+    Остальные методы обрабатывает синхронный DRF-view fallback, без
+    него - ответ 405.
+    """
+    viewset = getattr(fallback, 'cls', None)
+    if fallback is not None:
+        fallback = sync_to_async(fallback)
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                if fallback is None:
+                    return _handle_exception(
+                        Request(request),
+                        exceptions.MethodNotAllowed(request.method)
+                    )
+                return await fallback(request, *args, **kwargs)
+
+            drf_request = Request(request, authenticators=[
+                auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+            ])
+            try:
+                await sync_to_async(lambda: drf_request.user)()
+                return await view(drf_request, *args, **kwargs)
+            except Exception as exc:
+                return _handle_exception(drf_request, exc)
+
+        # Как и у DRF-view, CSRF проверяется аутентификацией
+        wrapper.csrf_exempt = True
+        # Для ReplicaRoutingMiddleware
+        wrapper.cls = viewset
+        return wrapper
+    return decorator
+
+
+async def _filter_recipes(request):
+    """Фильтрация RecipeViewSet через DjangoFilterBackend."""
+    filterset = RecipeQueryFilter(
+        request.query_params, Recipe.objects.all(), request=request
+    )
+    if not await sync_to_async(filterset.is_valid)():
+        raise translate_validation(filterset.errors)
+    return filterset.qs
+
+
+async def _recipe_batch(request):
+    """То же, что RecipeViewSet.list с ?ids=."""
+    ids = query_recipe_ids(request)
+    rows = {
+        row['id']: row
+        async for row in Recipe.objects.filter(id__in=ids).values(
+            *recipe_columns(request)
+        )
+    }
+    return await arecipes_data(
+        [rows[recipe_id] for recipe_id in ids if recipe_id in rows], request
+    )
+
+
+@async_read_view(RecipeViewSet.as_view(
+    {'get': 'list', 'post': 'create'}, basename='recipe', detail=False
+))
+async def recipe_list(request):
+    if 'ids' in request.query_params:
+        return _render(await _recipe_batch(request))
+    paginator = CustomPagePagination()
+    queryset = await _filter_recipes(request)
+    rows = await paginator.apaginate_queryset(
+        queryset.values(*recipe_columns(request)), request
+    )
+    data = await arecipes_data(rows, request)
+    return _render(paginator.get_paginated_response(data).data)
+
+
+@async_read_view(RecipeViewSet.as_view(
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+     'delete': 'destroy'},
+    basename='recipe', detail=True
+))
+async def recipe_detail(request, pk):
+    if not uses_recipe_cache(request):
+        queryset = await _filter_recipes(request)
+        row = await aget_object_or_404(
+            queryset.values(*recipe_columns(request)), pk=pk
+        )
+        data = await arecipes_data([row], request)
+        return _render(data[0])
+    # Кэш синхронный: ожидание вычисления другим запросом не должно
+    # блокировать цикл событий
+    shared = await sync_to_async(cached_recipe)(pk, request.user.pk)
+    if shared is None:
+        raise Http404
+    data = await arecipes_data(
+        [shared['row']], request, {'ingredients': shared['ingredients']}
+    )
+    return _render(data[0])
+
+
+@async_read_view(RecipeViewSet.as_view(
+    {'get': 'download_shopping_cart'},
+    basename='recipe', detail=False
+))
+async def download_shopping_cart(request):
+    """Список покупок отдаётся потоком по мере чтения строк из БД."""
+    if not request.user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+
+    queryset = shopping_cart_ingredients(request.user)
+    # Строки читаются уже после выхода из middleware: база выбирается
+    # сейчас, пока действует маршрутизация запроса
+    queryset = queryset.using(queryset.db)
+
+    async def lines():
+        separator = ''
+        async for ingredient in queryset:
+            yield separator + shopping_cart_line(ingredient)
+            separator = '\n'
+
+    return StreamingHttpResponse(lines(), content_type='text/plain')
+
+
+@async_read_view(IngredientViewSet.as_view(
+    {'get': 'list'}, basename='ingredient', detail=False
+))
+async def ingredient_list(request):
+    """Поиск как у SearchFilter с search_fields = ('^name',)."""
+    return _render(await sync_to_async(search_ingredients)(
+        SearchFilter().get_search_terms(request)
+    ))
+
+
+async def recipe_absolute_uri(request, short_link):
+    recipe_id = await sync_to_async(short_link_recipe_id)(short_link)
+    if recipe_id is None:
+        raise Http404
+    return redirect(
+        request.build_absolute_uri('/') + f'recipes/{recipe_id}/'
+    )
+
+
+@async_read_view()
+async def recipe_stream(request):
+    """
+    SSE с новыми рецептами авторов из подписок (api.events).
+
+    Пропущенное с прошлого подключения берётся по заголовку Last-Event-ID
+    (или ?last_event_id= для клиентов без него). Пользователь - из
+    ?ticket= (POST /api/recipes/stream/ticket/) или обычной аутентификации.
+    """
+    ticket = request.query_params.get('ticket')
+    if ticket is not None:
+        user_id = await events.aticket_user_id(ticket)
+        if user_id is None or not await User.objects.filter(
+            pk=user_id, is_active=True
+        ).aexists():
+            raise exceptions.AuthenticationFailed(
+                'Билет недействителен или истёк.'
+            )
+    elif request.user.is_authenticated:
+        user_id = request.user.pk
+    else:
+        raise exceptions.NotAuthenticated
+    if not isinstance(request._request, ASGIRequest):
+        return _render({'detail': 'Поток доступен только под ASGI.'},
+                       status.HTTP_501_NOT_IMPLEMENTED)
+    last_event_id = request.headers.get(
+        'Last-Event-ID', request.query_params.get('last_event_id', '')
+    )
+    response = StreamingHttpResponse(
+        events.stream(
+            user_id,
+            int(last_event_id) if last_event_id.isdigit() else None
+        ),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Nginx не буферизует поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
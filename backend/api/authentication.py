@@ -0,0 +1,154 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from constants import TOKEN_AUTH_CACHE_PREFIX, TOKEN_AUTH_CACHE_TIMEOUT
+from users.models import User
+
+
+JWT_USER_CLAIMS = (
+    'username',
+    'email',
+    'first_name',
+    'last_name',
+    'is_active',
+    'is_staff',
+    'is_superuser',
+)
+
+
+def token_cache_key(key):
+    """Ключ кэша для токена: сам токен в кэш не попадает."""
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'{TOKEN_AUTH_CACHE_PREFIX}:{digest}'
+
+
+def _generation_key(cache_key):
+    return f'{cache_key}:generation'
+
+
+def _invalidate(cache_keys):
+    """
+    Новое поколение токенов: запрос, прочитавший токен из БД до сброса,
+    запишет в кэш старое поколение, и запись не будет принята.
+    """
+    generation = time.time_ns()
+    cache.set_many({_generation_key(cache_key): generation
+                    for cache_key in cache_keys}, TOKEN_AUTH_CACHE_TIMEOUT)
+    cache.delete_many(cache_keys)
+
+
+def invalidate_token(key):
+    _invalidate([token_cache_key(key)])
+
+
+def invalidate_user_tokens(user_id):
+    keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    _invalidate([token_cache_key(key) for key in keys])
+
+
+def user_from_fields(user_id, fields):
+    """
+    Пользователь из id и полей JWT_USER_CLAIMS без запроса к БД.
+    Остальные поля (avatar, password и т.д.) остаются отложенными.
+    """
+    values = {**fields, User._meta.pk.attname: user_id}
+    # from_db ожидает значения в порядке полей модели
+    field_names = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in values
+    ]
+    return User.from_db(
+        router.db_for_read(User),
+        field_names,
+        [values[name] for name in field_names]
+    )
+
+
+def get_jwt_for_user(user):
+    """Refresh-токен с данными пользователя; access-токен их наследует."""
+    refresh = RefreshToken.for_user(user)
+    for claim in JWT_USER_CLAIMS:
+        refresh[claim] = getattr(user, claim)
+    return refresh
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с кэшированием пользователя по токену.
+
+    При попадании в кэш запрос к authtoken_token и users_user
+    не выполняется. В кэше только id и поля JWT_USER_CLAIMS, без хеша
+    пароля. Записи сбрасываются сигналами из api.signals после выхода,
+    смены пароля и деактивации пользователя; запись принимается, только
+    если её поколение совпадает с текущим поколением токена.
+
+    С кэшем процесса (SHARED_CACHE выключен) сброс не дошёл бы до других
+    воркеров, поэтому токен проверяется по БД, как в TokenAuthentication.
+    """
+
+    def authenticate_credentials(self, key):
+        if not settings.SHARED_CACHE:
+            return super().authenticate_credentials(key)
+        cache_key = token_cache_key(key)
+        generation_key = _generation_key(cache_key)
+        cached = cache.get_many([cache_key, generation_key])
+        generation = cached.get(generation_key)
+        entry = cached.get(cache_key)
+        if (entry is not None and generation is not None
+                and entry['generation'] == generation):
+            user = user_from_fields(entry['id'], entry['fields'])
+            return user, Token(key=key, user=user)
+
+        # Поколение читается до БД: сброс после чтения токена его сменит
+        if generation is None:
+            generation = time.time_ns()
+            if not cache.add(generation_key, generation,
+                             TOKEN_AUTH_CACHE_TIMEOUT):
+                generation = cache.get(generation_key)
+        user, token = super().authenticate_credentials(key)
+        if generation is not None:
+            cache.set(cache_key, {
+                'generation': generation,
+                'id': user.pk,
+                'fields': {claim: getattr(user, claim)
+                           for claim in JWT_USER_CLAIMS},
+            }, TOKEN_AUTH_CACHE_TIMEOUT)
+        return user, token
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Проверка подписанного access-токена без обращения к БД.
+
+    Пользователь собирается из claims токена, остальные поля
+    (avatar, password и т.д.) остаются отложенными и подгружаются
+    только при обращении к ним.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = User._meta.pk.to_python(
+                validated_token[jwt_settings.USER_ID_CLAIM]
+            )
+        except KeyError:
+            raise InvalidToken(
+                'Token contained no recognizable user identification'
+            )
+
+        if not validated_token.get('is_active'):
+            raise AuthenticationFailed('User inactive or deleted.')
+
+        return user_from_fields(user_id, {
+            claim: validated_token[claim] for claim in JWT_USER_CLAIMS
+        })
@@ -0,0 +1,206 @@
+"""
+Кэш горячих чтений, который не пропускает лавину запросов в БД.
+
+get_or_compute() хранит в кэше значение вместе со сроком годности и
+временем, за которое оно вычислялось:
+
+- вероятностное раннее обновление (XFetch): чем ближе срок и дороже
+  вычисление, тем вероятнее, что запрос обновит значение заранее, поэтому
+  популярные ключи не истекают одновременно;
+- после срока значение ещё CACHE_STALE_SECONDS отдаётся как есть, пока
+  один запрос его пересчитывает (stale-while-revalidate);
+- пустой ключ вычисляет один поток процесса, остальные ждут его
+  результат, но не дольше CACHE_LOCK_SECONDS; между процессами то же
+  делает блокировка cache.add(), и для неё кэш должен быть общим
+  (CACHE_BACKEND);
+- если пересчёт устаревшего значения упал, отдаётся устаревшее.
+
+С кэшем процесса (SHARED_CACHE выключен) сброс после изменений не
+доходит до других воркеров, поэтому значения живут не дольше
+LOCAL_CACHE_SECONDS.
+
+compute() читает основную БД: значение с отставшей реплики закрепилось
+бы в кэше на весь срок.
+"""
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from constants import (CACHE_EARLY_BETA, CACHE_LOCK_SECONDS,
+                       CACHE_STALE_SECONDS, CACHE_WAIT_SECONDS,
+                       LOCAL_CACHE_SECONDS)
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Вычисление ключа, которого ждут другие потоки процесса."""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _acquire(key):
+    """Блокировка пересчёта key: токен владельца или None, если занята."""
+    token = uuid.uuid4().hex
+    if cache.add(_lock_key(key), token, CACHE_LOCK_SECONDS):
+        return token
+    return None
+
+
+def _release(key, token):
+    """
+    Снимает блокировку, только если она ещё своя: за вычисление дольше
+    CACHE_LOCK_SECONDS её мог взять другой процесс.
+    """
+    lock_key = _lock_key(key)
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _is_fresh(expires, delta):
+    # -log(U) распределено экспоненциально: обычно запрос «сдвигает»
+    # своё время на доли delta, изредка - на несколько delta
+    early = -delta * CACHE_EARLY_BETA * math.log(1 - random.random())
+    return time.time() + early < expires
+
+
+def _compute(key, compute, timeout, stale):
+    start = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - start
+    cache.set(key, (value, time.time() + timeout, delta), timeout + stale)
+    return value
+
+
+def _single_flight(key, load):
+    """load() выполняет один поток процесса, остальные берут его результат."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        # Вычисляющий поток завис: дальше ждать незачем
+        if not flight.done.wait(CACHE_LOCK_SECONDS):
+            return load()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+    try:
+        flight.value = load()
+    except Exception as error:
+        flight.error = error
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+    return flight.value
+
+
+def _load(key, compute, timeout, stale):
+    """Значение пустого ключа: вычисляет владелец блокировки."""
+    deadline = time.monotonic() + CACHE_LOCK_SECONDS
+    token = _acquire(key)
+    while token is None:
+        # Вычисляет другой процесс
+        if time.monotonic() >= deadline:
+            # Владелец блокировки завис или упал
+            return _compute(key, compute, timeout, stale)
+        time.sleep(CACHE_WAIT_SECONDS)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        token = _acquire(key)
+    try:
+        # Ключ мог заполниться между промахом и блокировкой
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        return _compute(key, compute, timeout, stale)
+    finally:
+        _release(key, token)
+
+
+def get_or_compute(key, compute, timeout, stale=CACHE_STALE_SECONDS):
+    """
+    Значение key из кэша или compute(). Значение может быть None.
+
+    timeout - срок годности в секундах, stale - сколько ещё секунд после
+    него значение отдаётся, пока его пересчитывает другой запрос.
+    """
+    if not settings.SHARED_CACHE:
+        timeout = min(timeout, LOCAL_CACHE_SECONDS)
+        stale = min(stale, LOCAL_CACHE_SECONDS)
+    entry = cache.get(key)
+    if entry is None:
+        return _single_flight(
+            key, partial(_load, key, compute, timeout, stale)
+        )
+
+    value, expires, delta = entry
+    if _is_fresh(expires, delta):
+        return value
+    # Пересчитывает взявший блокировку, остальные отдают что есть
+    token = _acquire(key)
+    if token is None:
+        return value
+    try:
+        return _compute(key, compute, timeout, stale)
+    except Exception:
+        # Пока значение не вышло за stale, оно лучше ошибки; пересчёт
+        # повторит следующий запрос
+        logger.exception('Не удалось обновить ключ кэша %s', key)
+        return value
+    finally:
+        _release(key, token)
+
+
+def invalidate(*keys):
+    cache.delete_many(keys)
+
+
+def invalidate_on_commit(*keys, using=DEFAULT_DB_ALIAS):
+    """
+    Сброс после фиксации транзакции: иначе параллельный запрос успел бы
+    положить в кэш ещё не изменённые данные.
+    """
+    transaction.on_commit(partial(invalidate, *keys), using=using)
+
+
+def generation(namespace):
+    """
+    Поколение ключей namespace для ключей, которые нельзя перечислить
+    (например, по поисковому запросу). bump() переводит на новое.
+    """
+    key = f'{namespace}:generation'
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def bump(namespace):
+    cache.set(f'{namespace}:generation', time.time_ns(), None)
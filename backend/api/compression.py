@@ -0,0 +1,71 @@
+"""Сжатие тел ответов и выбор кодировки по Accept-Encoding."""
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Кодировка: (максимальное сжатие для готовых снимков, быстрое сжатие
+# ответов на лету). Порядок - предпочтение сервера.
+# gzip с mtime=0: одинаковое содержимое даёт одинаковые байты
+ENCODINGS = {}
+if brotli is not None:
+    ENCODINGS['br'] = (
+        lambda body: brotli.compress(body, quality=11),
+        lambda body: brotli.compress(body, quality=4),
+    )
+if zstandard is not None:
+    ENCODINGS['zstd'] = (
+        lambda body: zstandard.compress(body, 19),
+        lambda body: zstandard.compress(body, 3),
+    )
+ENCODINGS['gzip'] = (
+    lambda body: gzip.compress(body, compresslevel=9, mtime=0),
+    lambda body: gzip.compress(body, compresslevel=6, mtime=0),
+)
+
+
+def compress_all(body):
+    """Тело во всех доступных кодировках, для заранее сжатых ответов."""
+    return {
+        encoding: compress(body)
+        for encoding, (compress, _) in ENCODINGS.items()
+    }
+
+
+def compress(body, encoding):
+    """Быстрое сжатие ответа на лету."""
+    return ENCODINGS[encoding][1](body)
+
+
+def parse_accept_encoding(header):
+    """Кодировки из Accept-Encoding, которые клиент принимает (q > 0)."""
+    accepted = set()
+    for item in header.split(','):
+        encoding, _, params = item.strip().partition(';')
+        quality = params.strip().removeprefix('q=')
+        try:
+            if params and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def negotiate(header, available=ENCODINGS):
+    """Лучшая из available кодировка, принимаемая клиентом, или None."""
+    accepted = parse_accept_encoding(header or '')
+    for encoding in ENCODINGS:
+        if encoding in available and (
+            encoding in accepted or '*' in accepted
+        ):
+            return encoding
+    return None
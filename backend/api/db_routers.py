@@ -0,0 +1,77 @@
+"""Маршрутизация запросов чтения на реплики PostgreSQL."""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+class ReadRouting:
+    """Можно ли читать с реплики и была ли запись в текущем запросе."""
+
+    __slots__ = ('use_replica', 'wrote')
+
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+_current = ContextVar('read_routing', default=None)
+
+
+def start_request():
+    routing = ReadRouting()
+    return routing, _current.set(routing)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def write_wrapper(execute, sql, params, many, context):
+    """
+    Обёртка из execute_wrappers основной БД (см. api.signals): после
+    первого изменяющего запроса чтение возвращается на основную БД,
+    чтобы запрос видел собственные изменения.
+    """
+    routing = _current.get()
+    if (routing is not None and not routing.wrote
+            and sql.lstrip()[:6].upper() != 'SELECT'):
+        routing.use_replica = False
+        routing.wrote = True
+    return execute(sql, params, many, context)
+
+
+class ReplicaRouter:
+    """
+    Отправляет чтение на случайную реплику из REPLICA_DATABASES, если
+    запрос это разрешил (см. ReplicaRoutingMiddleware) и ещё ничего не
+    записал (см. write_wrapper). Запись всегда идёт в основную БД.
+    """
+
+    # Токены и сессии читаются с основной БД: запрос сразу после входа
+    # не должен зависеть от отставания реплики
+    replica_apps = {'recipes', 'users'}
+
+    def db_for_read(self, model, **hints):
+        routing = current()
+        if (routing is not None and routing.use_replica
+                and model._meta.app_label in self.replica_apps):
+            return random.choice(settings.REPLICA_DATABASES)
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Явно, иначе объект, прочитанный с реплики, записался бы туда же.
+        # Django вызывает метод и без записи (get_or_create, присваивание
+        # связей), поэтому сама запись отслеживается в write_wrapper
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
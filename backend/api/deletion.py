@@ -0,0 +1,145 @@
+"""
+Удаление рецептов и аккаунтов без загрузки связанных объектов.
+
+Model.delete() собирает в память все зависимые рецепты, ингредиенты,
+избранное, списки покупок и подписки, чтобы разослать сигналы, и для
+автора с тысячами рецептов это минуты и гигабайты. Здесь строки
+удаляются пачками по id одним DELETE на пачку, а работа сигналов
+(журнал sync, индекс похожих рецептов, удаление картинок, сброс кэша)
+выполняется пакетно. Большие аккаунты удаляет воркер (задача
+delete_account).
+"""
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from background.queue import enqueue_many_on_commit
+from recipes.models import Favorite, IngredientRecipe, Recipe, ShoppingCart
+from sync.models import Change
+from users.models import FollowSuggestion, Subscription, User
+from . import caching
+from .representations import recipe_cache_key
+from .tasks import delete_files, update_similarity_index
+from .utils import short_link_cache_key
+
+CHUNK_SIZE = 1000
+
+
+def _chunks(queryset):
+    """id строк queryset пачками по CHUNK_SIZE из основной БД."""
+    queryset = queryset.using(DEFAULT_DB_ALIAS).order_by('id')
+    last = 0
+    while True:
+        ids = list(
+            queryset.filter(id__gt=last).values_list('id', flat=True)
+            [:CHUNK_SIZE]
+        )
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def _delete(queryset, kind=None, object_field=None):
+    """
+    DELETE без Collector и сигналов. С kind удаления пишутся в журнал
+    sync: object_field - id объекта, user_id - владелец записи.
+    """
+    queryset = queryset.using(DEFAULT_DB_ALIAS)
+    if kind is not None:
+        Change.objects.bulk_create(
+            Change(kind=kind, object_id=object_id, user_id=user_id,
+                   deleted=True)
+            for user_id, object_id in queryset.values_list('user_id',
+                                                           object_field)
+        )
+    return queryset._raw_delete(DEFAULT_DB_ALIAS)
+
+
+def _delete_in_chunks(queryset, kind=None, object_field=None):
+    model = queryset.model
+    for ids in _chunks(queryset):
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            _delete(model.objects.filter(id__in=ids), kind, object_field)
+
+
+def delete_recipes(recipes):
+    """
+    Удаляет рецепты queryset вместе с ингредиентами, избранным и
+    списками покупок. Возвращает число удалённых рецептов.
+    """
+    deleted = 0
+    for ids in _chunks(recipes):
+        # Избранного у популярного рецепта может быть много: оно удаляется
+        # отдельными пачками, остаток - вместе с рецептами
+        relations = ((Favorite, Change.Kind.FAVORITE),
+                     (ShoppingCart, Change.Kind.SHOPPING_CART))
+        for model, kind in relations:
+            _delete_in_chunks(model.objects.filter(recipe_id__in=ids),
+                              kind, 'recipe_id')
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            rows = list(
+                Recipe.objects.using(DEFAULT_DB_ALIAS)
+                .select_for_update()
+                .filter(id__in=ids)
+                .values_list('id', 'image', 'short_link')
+            )
+            for model, kind in relations:
+                _delete(model.objects.filter(recipe_id__in=ids),
+                        kind, 'recipe_id')
+            _delete(IngredientRecipe.objects.filter(recipe_id__in=ids))
+            deleted += _delete(Recipe.objects.filter(id__in=ids))
+            Change.objects.bulk_create(
+                Change(kind=Change.Kind.RECIPE, object_id=recipe_id,
+                       deleted=True)
+                for recipe_id, _, _ in rows
+            )
+            enqueue_many_on_commit(
+                update_similarity_index,
+                [{'recipe_id': recipe_id} for recipe_id, _, _ in rows]
+            )
+            enqueue_many_on_commit(
+                delete_files,
+                [{'name': image} for _, image, _ in rows if image],
+                key=lambda payload: f'delete_files:{payload["name"]}'
+            )
+            caching.invalidate_on_commit(*(
+                key for recipe_id, _, short_link in rows
+                for key in (recipe_cache_key(recipe_id),
+                            short_link_cache_key(short_link))
+            ))
+    return deleted
+
+
+def deactivate_account(user):
+    """Закрывает вход до удаления аккаунта воркером."""
+    user.is_active = False
+    # Сигнал user_saved сбрасывает кэш токенов
+    user.save(update_fields=['is_active'])
+
+
+def delete_account(user_id):
+    """
+    Удаляет пользователя: рецепты и связи - пачками, остальное (токены,
+    журнал админки, группы) - штатным delete(). Повторный вызов для
+    удалённого пользователя ничего не делает.
+    """
+    delete_recipes(Recipe.objects.filter(author_id=user_id))
+    for queryset in (Favorite.objects.filter(user_id=user_id),
+                     ShoppingCart.objects.filter(user_id=user_id),
+                     Subscription.objects.filter(user_id=user_id),
+                     FollowSuggestion.objects.filter(user_id=user_id),
+                     FollowSuggestion.objects.filter(suggested_id=user_id)):
+        _delete_in_chunks(queryset)
+    # Подписчики узнают об отписке через /api/sync/
+    _delete_in_chunks(Subscription.objects.filter(subscribed_to_id=user_id),
+                      Change.Kind.SUBSCRIPTION, 'subscribed_to_id')
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        user = (User.objects.using(DEFAULT_DB_ALIAS).select_for_update()
+                .filter(id=user_id).first())
+        if user is None:
+            return
+        avatar = user.avatar.name
+        user.delete()
+        enqueue_many_on_commit(
+            delete_files, [{'name': avatar}] if avatar else [],
+            key=lambda payload: f'delete_files:{payload["name"]}'
+        )
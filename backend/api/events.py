@@ -0,0 +1,241 @@
+"""
+Поток новых рецептов авторов из подписок: GET /api/recipes/stream/ (SSE).
+
+После фиксации создания рецепта publish() рассылает событие. С PostgreSQL
+оно уходит в NOTIFY канала STREAM_CHANNEL, и каждый процесс получает его
+одним соединением LISTEN; с другой БД (SQLite в разработке) события
+доставляются только соединениям того же процесса.
+
+Внутри процесса Hub раскладывает события по индексу автор -> соединения.
+Очередь соединения ограничена STREAM_QUEUE_SIZE: отстающий клиент
+получает событие reset и перечитывает ленту сам, память не растёт.
+Поток работает только под ASGI (uvicorn): под WSGI каждое соединение
+занимает поток воркера.
+
+EventSource в браузере не передаёт заголовок Authorization, поэтому
+клиент получает короткоживущий одноразовый билет (issue_ticket) и
+открывает поток с ?ticket=.
+"""
+import asyncio
+import json
+import logging
+import secrets
+from collections import defaultdict
+
+import psycopg
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from constants import (STREAM_CHANNEL, STREAM_HEARTBEAT_SECONDS,
+                       STREAM_MAX_SECONDS, STREAM_QUEUE_SIZE, STREAM_REPLAY,
+                       STREAM_TICKET_SECONDS)
+from recipes.models import Recipe
+from users.models import Subscription
+
+logger = logging.getLogger(__name__)
+
+# Поля строки рецепта для события
+EVENT_FIELDS = ('id', 'author_id', 'name')
+LISTEN_RETRY_SECONDS = 5
+# Пауза переподключения EventSource, мс
+CLIENT_RETRY_MS = 3000
+TICKET_SALT = 'api.events.stream'
+
+
+def _uses_notify():
+    return connections[DEFAULT_DB_ALIAS].vendor == 'postgresql'
+
+
+def _event(row):
+    return {'id': row['id'], 'author': row['author_id'], 'name': row['name']}
+
+
+class Connection:
+    """Очередь событий одного клиента."""
+
+    __slots__ = ('authors', 'queue', 'overflowed')
+
+    def __init__(self, authors):
+        self.authors = authors
+        self.queue = asyncio.Queue(STREAM_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Hub:
+    """Подписки соединений процесса; методы вызываются в цикле событий."""
+
+    def __init__(self):
+        self.followers = defaultdict(set)
+        self.loop = None
+        self.listener = None
+
+    def subscribe(self, authors):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # Новый цикл событий (перезапуск воркера или тесты)
+            self.__init__()
+            self.loop = loop
+        if self.listener is None and _uses_notify():
+            self.listener = loop.create_task(self._listen())
+
+        connection = Connection(frozenset(authors))
+        for author in connection.authors:
+            self.followers[author].add(connection)
+        return connection
+
+    def unsubscribe(self, connection):
+        for author in connection.authors:
+            followers = self.followers.get(author)
+            if followers is None:
+                continue
+            followers.discard(connection)
+            if not followers:
+                del self.followers[author]
+
+    def dispatch(self, event):
+        for connection in self.followers.get(event['author'], ()):
+            connection.put(event)
+
+    def publish_local(self, event):
+        """dispatch из любого потока процесса."""
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.dispatch, event)
+
+    async def _listen(self):
+        # Параметры соединений Django вместе с OPTIONS (sslmode и т.д.);
+        # фабрика курсоров Django синхронная
+        params = connections[DEFAULT_DB_ALIAS].get_connection_params()
+        params.pop('cursor_factory', None)
+        while True:
+            try:
+                connection = await psycopg.AsyncConnection.connect(
+                    **params, autocommit=True
+                )
+                async with connection:
+                    await connection.execute(f'LISTEN {STREAM_CHANNEL}')
+                    async for notify in connection.notifies():
+                        self.dispatch(json.loads(notify.payload))
+            except (psycopg.Error, OSError):
+                # События за время переподключения клиенты догрузят
+                # по Last-Event-ID при своём переподключении
+                logger.exception('Ошибка LISTEN %s', STREAM_CHANNEL)
+                await asyncio.sleep(LISTEN_RETRY_SECONDS)
+
+
+hub = Hub()
+
+
+def publish(recipe):
+    """Событие о новом рецепте; вызывается после фиксации транзакции."""
+    event = _event({'id': recipe.pk, 'author_id': recipe.author_id,
+                    'name': recipe.name})
+    if _uses_notify():
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)',
+                           [STREAM_CHANNEL, json.dumps(event)])
+    else:
+        hub.publish_local(event)
+
+
+def issue_ticket(user_id):
+    """Билет на подключение к потоку, подписанный SECRET_KEY."""
+    nonce = secrets.token_urlsafe(16)
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(
+        f'{user_id}:{nonce}'
+    )
+
+
+async def aticket_user_id(ticket):
+    """
+    id пользователя из билета или None, если билет неверный, истёк или
+    уже использован. Билет попадает в журналы доступа вместе с URL,
+    поэтому одноразовый: первое подключение занимает его nonce в кэше.
+    Между воркерами это работает только с общим кэшем (SHARED_CACHE).
+    """
+    try:
+        user_id, nonce = signing.TimestampSigner(salt=TICKET_SALT).unsign(
+            ticket, max_age=STREAM_TICKET_SECONDS
+        ).split(':')
+        user_id = int(user_id)
+    except (signing.BadSignature, ValueError):
+        return None
+    if not await cache.aadd(f'{TICKET_SALT}:{nonce}', user_id,
+                            STREAM_TICKET_SECONDS):
+        return None
+    return user_id
+
+
+def _message(event, name='recipe'):
+    data = json.dumps(event, ensure_ascii=False)
+    return f'id: {event["id"]}\nevent: {name}\ndata: {data}\n\n'
+
+
+async def _missed(user_id, last_event_id):
+    """Не больше STREAM_REPLAY рецептов из подписок после last_event_id."""
+    if last_event_id is None:
+        return []
+    return [
+        _event(row)
+        async for row in Recipe.objects.filter(
+            author__subscriptions__user_id=user_id, id__gt=last_event_id
+        ).order_by('id').values(*EVENT_FIELDS)[:STREAM_REPLAY]
+    ]
+
+
+async def stream(user_id, last_event_id=None):
+    """
+    Тело ответа SSE: рецепты после last_event_id, затем новые.
+
+    Подписки читаются при подключении. Через STREAM_MAX_SECONDS поток
+    закрывается: клиент переподключается с Last-Event-ID и заодно
+    получает новые подписки.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STREAM_MAX_SECONDS
+    authors = [
+        author async for author in Subscription.objects.filter(
+            user_id=user_id
+        ).values_list('subscribed_to_id', flat=True)
+    ]
+    # Подписка раньше чтения пропущенного, чтобы не потерять событие
+    # между ними; повторы отсекаются по id
+    connection = hub.subscribe(authors)
+    try:
+        missed = await _missed(user_id, last_event_id)
+        # Дальше поток не обращается к БД: соединение не держится
+        # открытым всё время жизни потока
+        await sync_to_async(connections.close_all)()
+
+        last_id = 0
+        yield f'retry: {CLIENT_RETRY_MS}\n\n'
+        for event in missed:
+            last_id = event['id']
+            yield _message(event)
+        while loop.time() < deadline:
+            if connection.overflowed:
+                connection.overflowed = False
+                yield 'event: reset\ndata: {}\n\n'
+            try:
+                event = await asyncio.wait_for(
+                    connection.queue.get(),
+                    min(STREAM_HEARTBEAT_SECONDS, deadline - loop.time())
+                )
+            except asyncio.TimeoutError:
+                # Комментарий SSE: держит соединение через прокси и
+                # обнаруживает отключившихся клиентов
+                yield ': ping\n\n'
+                continue
+            # Уже отправлено из missed
+            if event['id'] > last_id:
+                yield _message(event)
+    finally:
+        hub.unsubscribe(connection)
@@ -0,0 +1,56 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import (CachedTokenAuthentication,
+                                StatelessJWTAuthentication, get_jwt_for_user)
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает классы аутентификации: запросы к БД и время'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username='bench_auth', email='bench_auth@example.com',
+                password='bench_auth', first_name='Тест', last_name='Тест'
+            )
+            key = Token.objects.create(user=user).key
+            access = str(get_jwt_for_user(user).access_token)
+            cache.clear()
+            for auth, credentials in (
+                (TokenAuthentication(), key),
+                (CachedTokenAuthentication(), key),
+                (StatelessJWTAuthentication(), access),
+            ):
+                self._run(auth, credentials, iterations)
+            transaction.set_rollback(True)
+
+    def _run(self, auth, credentials, iterations):
+        request = Request(APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Token {credentials}'
+        ))
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                auth.authenticate(request)
+            elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f'{type(auth).__name__}: '
+            f'{len(queries) / iterations:.3f} запросов/запрос, '
+            f'{elapsed / iterations * 1e6:.1f} мкс/запрос, '
+            f'{iterations / elapsed:.0f} запросов/с'
+        )
@@ -0,0 +1,100 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from api.management.endpoints import ENDPOINTS, endpoint_context
+
+
+class Command(BaseCommand):
+    help = ('Пропускная способность запущенного сервера при разном числе '
+            'одновременных клиентов. Запускается против WSGI (gunicorn) и '
+            'ASGI (uvicorn, ASYNC_VIEWS=1) для сравнения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', required=True,
+                            help='Адрес сервера, например '
+                                 'http://localhost:8000')
+        parser.add_argument('--concurrency', type=int, nargs='+',
+                            default=[1, 10, 50, 100],
+                            help='Число одновременных клиентов')
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Длительность прогона на уровень, секунд')
+        parser.add_argument('--endpoints', nargs='+', default=[
+            'feed', 'detail', 'ingredient_search', 'download_shopping_cart'
+        ], choices=ENDPOINTS, help='Эндпоинты из api.management.endpoints')
+        parser.add_argument('--output',
+                            help='Куда сохранить результат, например '
+                                 'gthread.json для сравнения профилей '
+                                 'gunicorn')
+
+    def handle(self, *args, **options):
+        user, params = endpoint_context()
+        if user is None:
+            raise CommandError('База пуста, запустите generate_data')
+        token = Token.objects.get_or_create(user=user)[0].key
+        base_url = options['base_url'].rstrip('/')
+        urls = [
+            base_url + ENDPOINTS[name].format(**params)
+            for name in options['endpoints']
+        ]
+
+        results = {}
+        for concurrency in options['concurrency']:
+            latencies, errors, elapsed = self._run(
+                urls, token, concurrency, options['duration']
+            )
+            if len(latencies) < 2:
+                raise CommandError(f'{concurrency}: нет успешных ответов')
+            results[concurrency] = {
+                'rps': round(len(latencies) / elapsed, 1),
+                'p95_ms': round(
+                    statistics.quantiles(latencies, n=100)[94], 2
+                ),
+                'errors': errors,
+            }
+            self.stdout.write(
+                f'клиентов {concurrency}: '
+                f'{results[concurrency]["rps"]} RPS, '
+                f'p95={results[concurrency]["p95_ms"]} мс, '
+                f'ошибок: {errors}'
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+
+    def _run(self, urls, token, concurrency, duration):
+        deadline = time.perf_counter() + duration
+        latencies, lock = [], threading.Lock()
+        errors = 0
+
+        def client(offset):
+            nonlocal errors
+            session = requests.Session()
+            session.headers['Authorization'] = f'Token {token}'
+            index = offset
+            while time.perf_counter() < deadline:
+                url = urls[index % len(urls)]
+                index += 1
+                start = time.perf_counter()
+                try:
+                    ok = session.get(url).status_code == 200
+                except requests.RequestException:
+                    ok = False
+                latency = (time.perf_counter() - start) * 1000
+                with lock:
+                    if ok:
+                        latencies.append(latency)
+                    else:
+                        errors += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(client, range(concurrency)))
+        return latencies, errors, time.perf_counter() - start
@@ -0,0 +1,104 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from api import deletion
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart)
+from users.models import Subscription, User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает удаление автора через Model.delete() и '
+            'api.deletion: время и пиковую память Python. Данные '
+            'создаются в транзакции и откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--ingredients', type=int, default=10)
+        parser.add_argument('--fans', type=int, default=200,
+                            help='Пользователей с избранным, списком '
+                                 'покупок и подпиской на автора')
+        parser.add_argument('--favorites-per-fan', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            author = self._seed(options)
+            point = transaction.savepoint()
+            methods = {
+                'Model.delete()': lambda: User.objects.get(
+                    pk=author.pk
+                ).delete(),
+                'api.deletion': lambda: deletion.delete_account(author.pk),
+            }
+            results = {}
+            for name, method in methods.items():
+                start = time.perf_counter()
+                method()
+                elapsed = time.perf_counter() - start
+                transaction.savepoint_rollback(point)
+
+                tracemalloc.start()
+                method()
+                peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                tracemalloc.stop()
+                transaction.savepoint_rollback(point)
+
+                results[name] = elapsed, peak
+                self.stdout.write(
+                    f'{name}: {elapsed:.2f} с, пик памяти {peak:.1f} МБ'
+                )
+            (legacy_time, legacy_peak), (time_, peak) = results.values()
+            self.stdout.write(
+                f'Экономия: {legacy_time - time_:.2f} с '
+                f'({legacy_time / time_:.1f}x), '
+                f'{legacy_peak - peak:.1f} МБ ({legacy_peak / peak:.1f}x)'
+            )
+            transaction.set_rollback(True, using=DEFAULT_DB_ALIAS)
+
+    def _seed(self, options):
+        users = User.objects.bulk_create(
+            User(username=f'bench_delete_{i}',
+                 email=f'bench_delete_{i}@example.com',
+                 first_name='Тест', last_name='Тест')
+            for i in range(options['fans'] + 1)
+        )
+        author, fans = users[0], users[1:]
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'bench_delete_{i}', measurement_unit='г')
+            for i in range(options['ingredients'] * 5)
+        )
+        recipes = Recipe.objects.bulk_create(
+            (Recipe(author=author, name=f'Рецепт {i}',
+                    image=f'images/recipes/bench_delete_{i}.png',
+                    text='Описание ' * 50, cooking_time=10,
+                    short_link=f'bdel{i}')
+             for i in range(options['recipes'])),
+            batch_size=1000
+        )
+        IngredientRecipe.objects.bulk_create(
+            (
+                IngredientRecipe(
+                    recipe=recipe,
+                    ingredient=ingredients[(i + j) % len(ingredients)],
+                    amount=j + 1
+                )
+                for i, recipe in enumerate(recipes)
+                for j in range(options['ingredients'])
+            ),
+            batch_size=5000
+        )
+        per_fan = min(options['favorites_per_fan'], len(recipes))
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                (model(user=fan, recipe=recipes[(i * 7 + j) % len(recipes)])
+                 for i, fan in enumerate(fans)
+                 for j in range(per_fan)),
+                batch_size=5000
+            )
+        Subscription.objects.bulk_create(
+            Subscription(user=fan, subscribed_to=author) for fan in fans
+        )
+        return author
@@ -0,0 +1,118 @@
+import json
+import re
+import statistics
+import time
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.management.endpoints import ENDPOINTS, endpoint_context
+
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон основных эндпоинтов: p50/p95/p99 и '
+            'SQL-запросы на запрос. Результат сохраняется в JSON и '
+            'сравнивается с прошлым прогоном.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на эндпоинт')
+        parser.add_argument('--base-url',
+                            help='Адрес запущенного сервера, например '
+                                 'http://localhost:8000. По умолчанию '
+                                 'используется тестовый клиент Django.')
+        parser.add_argument('--output', help='Куда сохранить результат')
+        parser.add_argument('--baseline', help='JSON прошлого прогона')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Допустимый рост p95 относительно baseline')
+
+    def handle(self, *args, **options):
+        user, params = endpoint_context()
+        if user is None:
+            raise CommandError('База пуста, запустите generate_data')
+        token = Token.objects.get_or_create(user=user)[0].key
+        get = self._client(options['base_url'], token)
+
+        results = {}
+        for name, endpoint in ENDPOINTS.items():
+            url = endpoint.format(**params)
+            get(url)  # прогрев
+            latencies, queries = [], []
+            for _ in range(options['requests']):
+                start = time.perf_counter()
+                response = get(url)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f'{url}: {response.status_code}')
+                match = QUERIES_RE.search(
+                    response.headers.get('Server-Timing', '')
+                )
+                if match:
+                    queries.append(int(match.group(1)))
+            results[name] = self._summary(url, latencies, queries)
+            self.stdout.write(
+                f'{name}: p50={results[name]["p50_ms"]} '
+                f'p95={results[name]["p95_ms"]} '
+                f'p99={results[name]["p99_ms"]} мс, '
+                f'запросов к БД: {results[name]["queries_per_request"]}'
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            self._compare(results, options['baseline'], options['tolerance'])
+
+    def _client(self, base_url, token):
+        if base_url:
+            session = requests.Session()
+            session.headers['Authorization'] = f'Token {token}'
+            return lambda url: session.get(base_url.rstrip('/') + url)
+
+        client = APIClient(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        return client.get
+
+    def _summary(self, url, latencies, queries):
+        percentiles = statistics.quantiles(latencies, n=100)
+        return {
+            'url': url,
+            'requests': len(latencies),
+            'p50_ms': round(percentiles[49], 2),
+            'p95_ms': round(percentiles[94], 2),
+            'p99_ms': round(percentiles[98], 2),
+            'queries_per_request': (
+                round(statistics.mean(queries), 2) if queries else None
+            ),
+        }
+
+    def _compare(self, results, baseline_path, tolerance):
+        with open(baseline_path, encoding='utf-8') as file:
+            baseline = json.load(file)
+
+        regressions = []
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: p95 {before["p95_ms"]} -> {result["p95_ms"]} мс'
+                )
+            if (result['queries_per_request'] or 0) > (
+                before['queries_per_request'] or 0
+            ):
+                regressions.append(
+                    f'{name}: запросов к БД {before["queries_per_request"]}'
+                    f' -> {result["queries_per_request"]}'
+                )
+
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,85 @@
+import re
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.management.endpoints import endpoint_context
+
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+# Эндпоинт и типичные наборы полей; первый набор - полный ответ
+FIELDSETS = {
+    'feed': ('/api/recipes/?', (
+        '',
+        'fields=id,name,image,cooking_time',
+        'omit=text,ingredients',
+        'omit=author',
+        'fields=id',
+    )),
+    'detail': ('/api/recipes/{recipe_id}/?', (
+        '',
+        'omit=ingredients',
+        'fields=id,name,text',
+    )),
+    'subscriptions': ('/api/users/subscriptions/?recipes_limit=3&', (
+        '',
+        'omit=recipes',
+        'fields=id,username,avatar',
+    )),
+    'me': ('/api/users/me/?', (
+        '',
+        'fields=id,username',
+    )),
+}
+
+
+class Command(BaseCommand):
+    help = ('Размер ответа, задержка и SQL-запросы основных эндпоинтов '
+            'для типичных ?fields= и ?omit=')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на набор полей')
+
+    def handle(self, *args, **options):
+        user, params = endpoint_context()
+        if user is None:
+            raise CommandError('База пуста, запустите generate_data')
+        token = Token.objects.get_or_create(user=user)[0].key
+        client = APIClient(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+        for name, (endpoint, subsets) in FIELDSETS.items():
+            full_size = None
+            for subset in subsets:
+                url = endpoint.format(**params) + subset
+                size, latencies, queries = self._measure(
+                    client, url, options['requests']
+                )
+                full_size = full_size or size
+                percentiles = statistics.quantiles(latencies, n=100)
+                self.stdout.write(
+                    f'{name} [{subset or "все поля"}]: '
+                    f'{size} байт ({size / full_size:.0%}), '
+                    f'p50={percentiles[49]:.2f} '
+                    f'p95={percentiles[94]:.2f} мс, '
+                    f'запросов к БД: {queries}'
+                )
+
+    def _measure(self, client, url, count):
+        client.get(url)  # прогрев
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.get(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: {response.status_code}')
+        match = QUERIES_RE.search(response.headers.get('Server-Timing', ''))
+        return (len(response.content), latencies,
+                int(match.group(1)) if match else None)
@@ -0,0 +1,57 @@
+import resource
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api import suggestions
+from constants import FOLLOW_SUGGESTIONS_PER_USER
+
+
+class Command(BaseCommand):
+    help = ('Замеряет пакетный расчёт рекомендаций подписок на синтетическом '
+            'графе без БД: время и пиковую память процесса. Популярность '
+            'авторов и рецептов распределена по Ципфу.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=1_000_000)
+        parser.add_argument('--favorites-per-user', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        users = options['users']
+
+        def pairs(per_user, targets):
+            owners = np.repeat(np.arange(1, users + 1), per_user)
+            chosen = np.minimum(rng.zipf(1.5, len(owners)), targets)
+            # Пары уникальны, как в Subscription и Favorite
+            keys = np.unique(owners * (targets + 1) + chosen)
+            return np.divmod(keys, targets + 1)
+
+        start = time.perf_counter()
+        graph = suggestions.Graph(
+            np.arange(1, users + 1),
+            pairs(options['subscriptions_per_user'], users),
+            pairs(options['favorites_per_user'], options['recipes']),
+        )
+        self.stdout.write(
+            f'Граф: {len(graph.follows.indices)} подписок, '
+            f'{len(graph.favorites.indices)} избранных, '
+            f'{time.perf_counter() - start:.1f} с'
+        )
+
+        start = time.perf_counter()
+        blocks = created = 0
+        for block in graph.blocks():
+            created += len(graph.suggestions(
+                *block, FOLLOW_SUGGESTIONS_PER_USER
+            )[0])
+            blocks += 1
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss >> 10
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендаций: {created}, блоков: {blocks}, '
+            f'{time.perf_counter() - start:.1f} с, пик памяти {peak} МБ'
+        ))
@@ -0,0 +1,52 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIClient
+
+from api import snapshots
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает размер ответа и задержку снимка справочника '
+            'ингредиентов с обычным списком /api/ingredients/.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на вариант')
+
+    def handle(self, *args, **options):
+        ingredient = Ingredient.objects.first()
+        if ingredient is None:
+            raise CommandError('Справочник пуст, запустите load_data')
+
+        client = APIClient(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        version = snapshots.build()
+        snapshot = f'/api/ingredients/snapshot/{version}/'
+        variants = {
+            'список': ('/api/ingredients/', {}),
+            'поиск': (f'/api/ingredients/?name={ingredient.name[:3]}', {}),
+            'снимок': (snapshot, {}),
+        }
+        for encoding in snapshots.get_bodies(version):
+            if encoding != snapshots.IDENTITY:
+                variants[f'снимок {encoding}'] = (
+                    snapshot, {'HTTP_ACCEPT_ENCODING': encoding}
+                )
+        variants['снимок 304'] = (
+            snapshot, {'HTTP_IF_NONE_MATCH': f'"{version}"'}
+        )
+
+        for name, (url, headers) in variants.items():
+            latencies = []
+            for _ in range(options['requests']):
+                start = time.perf_counter()
+                response = client.get(url, **headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+            percentiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f'{name}: {len(response.content)} байт, '
+                f'p50={percentiles[49]:.2f} p95={percentiles[94]:.2f} мс'
+            )
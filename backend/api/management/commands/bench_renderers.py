@@ -0,0 +1,92 @@
+import time
+from io import BytesIO
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает JSONRenderer/JSONParser и '
+            'FastJSONRenderer/FastJSONParser')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument('--ingredients', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write('orjson не установлен, сравнивать не с чем')
+            return
+
+        data = self._payload(options['recipes'], options['ingredients'])
+        repeat = options['repeat']
+        body = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != body:
+            raise CommandError('Ответы рендереров не совпадают')
+
+        self.stdout.write(f'Страница: {len(body) / 1024:.1f} КБ')
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            elapsed = self._time(lambda: renderer.render(data), repeat)
+            self.stdout.write(f'{type(renderer).__name__}: {elapsed:.0f} мкс')
+        request_body = JSONRenderer().render(self._request_payload())
+        self.stdout.write(f'POST рецепта: {len(request_body) / 1024:.1f} КБ')
+        for parser in (JSONParser(), FastJSONParser()):
+            elapsed = self._time(
+                lambda: parser.parse(BytesIO(request_body)), repeat
+            )
+            self.stdout.write(f'{type(parser).__name__}: {elapsed:.0f} мкс')
+
+    def _time(self, func, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) / repeat * 1e6
+
+    def _request_payload(self):
+        return {
+            'ingredients': [{'id': i, 'amount': 10} for i in range(10)],
+            'name': 'Рецепт',
+            'image': 'data:image/png;base64,' + 'iVBORw0KGgo' * 20000,
+            'text': 'Нарезать, перемешать и запечь. ' * 20,
+            'cooking_time': 30
+        }
+
+    def _payload(self, recipes, ingredients):
+        author = {
+            'username': 'ivan', 'first_name': 'Иван',
+            'last_name': 'Иванов', 'id': 1, 'email': 'ivan@example.com',
+            'is_subscribed': False,
+            'avatar': 'http://localhost/media/images/avatar/ivan.png'
+        }
+        return {
+            'count': recipes * 10,
+            'next': 'http://localhost/api/recipes/?page=2',
+            'previous': None,
+            'generated': datetime.now(timezone.utc),
+            'results': [
+                {
+                    'id': i,
+                    'author': author,
+                    'ingredients': [
+                        {'id': j, 'name': f'Ингредиент {j}',
+                         'measurement_unit': 'г', 'amount': j * 10}
+                        for j in range(ingredients)
+                    ],
+                    'is_favorited': i % 2 == 0,
+                    'is_in_shopping_cart': False,
+                    'name': f'Рецепт {i}',
+                    'image': f'http://localhost/media/images/recipes/{i}.jpg',
+                    'text': 'Нарезать, перемешать и запечь. ' * 20,
+                    'cooking_time': 30,
+                    'rating': Decimal('4.5')
+                }
+                for i in range(recipes)
+            ]
+        }
@@ -0,0 +1,117 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.representations import (RECIPE_FIELDS, USER_FIELDS, recipes_data,
+                                 subscriptions_data)
+from api.serializers import (RecipeDetailViewSerializer,
+                             SubscriptionUserSerializer)
+from recipes.models import Favorite, Ingredient, IngredientRecipe, Recipe
+from users.models import Subscription, User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает ModelSerializer и api.representations '
+            'на страницах рецептов и подписок (мкс на объект)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument('--ingredients', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            viewer, authors = self._seed(
+                options['recipes'], options['ingredients']
+            )
+            request = APIRequestFactory().get(
+                '/', {'recipes_limit': 3},
+                HTTP_HOST=settings.ALLOWED_HOSTS[0]
+            )
+            force_authenticate(request, user=viewer)
+            request = Request(request)
+            request.user = viewer
+
+            recipes = Recipe.objects.filter(author__in=authors)
+            self._compare(
+                'recipes',
+                lambda: RecipeDetailViewSerializer(
+                    recipes, many=True, context={'request': request}
+                ).data,
+                lambda: recipes_data(recipes.values(*RECIPE_FIELDS), request),
+                recipes.count(),
+                options['repeat']
+            )
+
+            authors = User.objects.filter(subscriptions__user=viewer)
+            self._compare(
+                'subscriptions',
+                lambda: SubscriptionUserSerializer(
+                    authors, many=True, context={'request': request}
+                ).data,
+                lambda: subscriptions_data(
+                    authors.values(*USER_FIELDS), request
+                ),
+                authors.count(),
+                options['repeat']
+            )
+            transaction.set_rollback(True)
+
+    def _seed(self, recipes_count, ingredients_count):
+        users = User.objects.bulk_create(
+            User(username=f'bench_{i}', email=f'bench_{i}@example.com',
+                 first_name='Тест', last_name='Тест')
+            for i in range(11)
+        )
+        viewer, authors = users[0], users[1:]
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'bench_{i}', measurement_unit='г')
+            for i in range(ingredients_count * 5)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=authors[i % len(authors)], name=f'Рецепт {i}',
+                   image=f'images/recipes/bench_{i}.png',
+                   text='Описание ' * 50, cooking_time=10,
+                   short_link=f'bench{i}')
+            for i in range(recipes_count)
+        )
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe,
+                ingredient=ingredients[(i + j) % len(ingredients)],
+                amount=j + 1
+            )
+            for i, recipe in enumerate(recipes)
+            for j in range(ingredients_count)
+        )
+        Favorite.objects.bulk_create(
+            Favorite(user=viewer, recipe=recipe) for recipe in recipes[::3]
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=viewer, subscribed_to=author)
+            for author in authors
+        )
+        return viewer, authors
+
+    def _compare(self, name, legacy, compiled, count, repeat):
+        renderer = JSONRenderer()
+        if renderer.render(legacy()) != renderer.render(compiled()):
+            raise CommandError(f'{name}: ответы не совпадают')
+
+        results = []
+        for build in (legacy, compiled):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                build()
+            results.append(
+                (time.perf_counter() - start) / repeat / max(count, 1) * 1e6
+            )
+        self.stdout.write(
+            f'{name}: ModelSerializer {results[0]:.1f} мкс/объект, '
+            f'representations {results[1]:.1f} мкс/объект'
+        )
@@ -0,0 +1,82 @@
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api import similarity
+
+
+class Command(BaseCommand):
+    help = ('Замеряет сборку индекса рецептов, поиск похожих и подбор по '
+            'продуктам на синтетическом каталоге без БД. Популярность '
+            'ингредиентов распределена по Ципфу, как у соли и сахара в '
+            'реальных рецептах.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1_000_000)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--per-recipe', type=int, default=10)
+        parser.add_argument('--pantry-size', type=int, default=15,
+                            help='Продуктов в запросе подбора')
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        count, per_recipe = options['recipes'], options['per_recipe']
+        start = time.perf_counter()
+        recipe_ids = np.repeat(np.arange(1, count + 1), per_recipe)
+        ingredient_ids = np.minimum(
+            rng.zipf(1.3, count * per_recipe), options['ingredients']
+        ).astype(np.int64)
+        # Ингредиент входит в рецепт один раз, как в IngredientRecipe
+        pairs = np.unique(recipe_ids * (options['ingredients'] + 1)
+                          + ingredient_ids)
+        recipe_ids, ingredient_ids = np.divmod(pairs,
+                                               options['ingredients'] + 1)
+        arrays = similarity.base_arrays(recipe_ids, ingredient_ids)
+        self.stdout.write(
+            f'Сборка: {time.perf_counter() - start:.1f} с, '
+            f'{sum(array.nbytes for array in arrays.values()) >> 20} МБ'
+        )
+
+        with tempfile.TemporaryDirectory() as path:
+            for name, array in arrays.items():
+                np.save(Path(path) / f'{name}.npy', array)
+            del arrays
+            index = similarity.Index.load(Path(path))
+            sample = random.Random(options['seed'])
+            limit = options['limit']
+
+            def similar():
+                recipe_id = sample.randint(1, count)
+                index.similar(recipe_id, index.ingredients(recipe_id), limit)
+
+            def pantry():
+                # Продукты под рукой тоже чаще всего популярные
+                ingredients = np.minimum(
+                    rng.zipf(1.3, options['pantry_size']),
+                    options['ingredients']
+                )
+                index.pantry(ingredients, limit)
+
+            for name, query in (('Похожие', similar),
+                                ('Из продуктов', pantry)):
+                self._measure(name, query, options['queries'])
+
+    def _measure(self, name, query, count):
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            query()
+            latencies.append((time.perf_counter() - start) * 1000)
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: p50={percentiles[49]:.2f} p95={percentiles[94]:.2f} '
+            f'p99={percentiles[98]:.2f} мс'
+        ))
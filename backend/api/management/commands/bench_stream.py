@@ -0,0 +1,73 @@
+import asyncio
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.events import hub
+
+
+class Command(BaseCommand):
+    help = ('Замеряет Hub потока /api/recipes/stream/ без HTTP и БД: '
+            'память на простаивающее соединение и время рассылки события '
+            'всем подписчикам автора.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=10000)
+        parser.add_argument('--subscriptions', type=int, default=50,
+                            help='Авторов в подписках соединения')
+        parser.add_argument('--authors', type=int, default=100000)
+        parser.add_argument('--events', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        rng = np.random.default_rng(options['seed'])
+        delivered = 0
+
+        async def client(connection):
+            # Как events.stream: ждёт очередь и отдаёт события
+            nonlocal delivered
+            while True:
+                await connection.queue.get()
+                delivered += 1
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        tasks = []
+        for _ in range(options['connections']):
+            # Популярность авторов распределена по Ципфу
+            authors = np.minimum(
+                rng.zipf(1.5, options['subscriptions']), options['authors']
+            ).tolist()
+            tasks.append(asyncio.create_task(client(hub.subscribe(authors))))
+        await asyncio.sleep(0)
+        per_connection = (
+            (tracemalloc.get_traced_memory()[0] - before)
+            / options['connections']
+        )
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{options["connections"]} соединений: '
+            f'{per_connection / 1024:.1f} КБ на соединение'
+        )
+
+        authors = np.minimum(
+            rng.zipf(1.5, options['events']), options['authors']
+        ).tolist()
+        start = time.perf_counter()
+        for number, author in enumerate(authors):
+            hub.dispatch({'id': number, 'author': author, 'name': ''})
+            # Клиенты разбирают очереди между событиями
+            await asyncio.sleep(0)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{options["events"]} событий, {delivered} доставок: '
+            f'{elapsed / options["events"] * 1000:.2f} мс на событие, '
+            f'{elapsed / max(delivered, 1) * 1e6:.2f} мкс на доставку'
+        )
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import suggestions
+from constants import FOLLOW_SUGGESTIONS_PER_USER
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации подписок для всех пользователей. '
+            'Запускается по расписанию, например раз в сутки из cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int,
+                            default=FOLLOW_SUGGESTIONS_PER_USER,
+                            help='Рекомендаций на пользователя')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        created = suggestions.build(options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендаций: {created}, {time.perf_counter() - start:.1f} с'
+        ))
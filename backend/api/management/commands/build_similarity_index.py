@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import similarity
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает индекс похожих рецептов целиком. Нужен после '
+            'массовой загрузки рецептов в обход API.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        generation = similarity.build()
+        index = similarity.get_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Поколение {generation}: рецептов {len(index.ids)}, '
+            f'связей {len(index.indices)}, '
+            f'{time.perf_counter() - start:.1f} с'
+        ))
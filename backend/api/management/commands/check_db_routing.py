@@ -0,0 +1,82 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.management.endpoints import (ENDPOINTS, NO_CACHE,
+                                      endpoint_context)
+from recipes.models import Recipe
+
+# Ответ целиком из api.caching, который заполняется с основной БД
+PRIMARY_ENDPOINTS = {'ingredient_search'}
+
+
+class Command(BaseCommand):
+    help = ('Проверяет маршрутизацию БД: GET-запросы читают с реплик, а '
+            'после записи запросы клиента идут в основную БД. Работает с '
+            'любой парой основная БД / реплика, в том числе с двумя '
+            'файлами SQLite.')
+
+    @override_settings(CACHES=NO_CACHE)
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('Реплики не настроены '
+                               '(POSTGRES_REPLICA_HOSTS)')
+        user, params = endpoint_context()
+        if user is None:
+            raise CommandError('База пуста, запустите generate_data')
+        recipe = Recipe.objects.exclude(recipe_favorites__user=user).first()
+        if recipe is None:
+            raise CommandError('Нет рецепта вне избранного пользователя')
+
+        client = APIClient(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        errors = []
+        for name, endpoint in ENDPOINTS.items():
+            if name in PRIMARY_ENDPOINTS:
+                continue
+            if not self._reads_replica(client, endpoint.format(**params)):
+                errors.append(f'{name}: чтение не с реплики')
+
+        favorite = f'/api/recipes/{recipe.id}/favorite/'
+        if client.post(favorite).status_code != 201:
+            raise CommandError(f'{favorite}: запись не удалась')
+        try:
+            detail = f'/api/recipes/{recipe.id}/'
+            if self._reads_replica(client, detail):
+                errors.append('после записи чтение не с основной БД')
+            client.cookies.pop(settings.REPLICA_STICKY_COOKIE, None)
+            if not self._reads_replica(client, detail):
+                errors.append('без cookie чтение не вернулось на реплику')
+        finally:
+            client.delete(favorite)
+
+        if errors:
+            raise CommandError('\n'.join(errors))
+        self.stdout.write(self.style.SUCCESS('Маршрутизация работает'))
+
+    def _reads_replica(self, client, url):
+        """Выполняет GET и печатает число запросов к каждой БД."""
+        with ExitStack() as stack:
+            captured = {
+                alias: stack.enter_context(
+                    CaptureQueriesContext(connections[alias])
+                )
+                for alias in [DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES]
+            }
+            response = client.get(url)
+            # Потоковый ответ читает БД при отдаче содержимого
+            b''.join(response)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: {response.status_code}')
+
+        counts = {alias: len(queries) for alias, queries in captured.items()}
+        self.stdout.write(
+            f'{url}: ' + ', '.join(f'{a}={n}' for a, n in counts.items())
+        )
+        return sum(counts.values()) > counts[DEFAULT_DB_ALIAS]
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from api.management.endpoints import (ENDPOINTS, NO_CACHE,
+                                      endpoint_context)
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN для SQL-запросов основных эндпоинтов '
+            'и отмечает последовательные сканирования таблиц. '
+            'Запускать на заполненной базе: на маленьких таблицах '
+            'планировщик выбирает Seq Scan независимо от индексов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail', action='store_true',
+            help='Завершиться с ошибкой, если найдены Seq Scan'
+        )
+
+    @override_settings(CACHES=NO_CACHE)
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f'EXPLAIN для {connection.vendor} не поддержан')
+
+        user, params = endpoint_context()
+        if user is None:
+            raise CommandError('Нужны пользователи, рецепты и ингредиенты')
+
+        client = APIClient(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        client.force_authenticate(user)
+
+        flagged = 0
+        for endpoint in ENDPOINTS.values():
+            url = endpoint.format(**params)
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{url}: {len(queries)} запросов'
+            ))
+            for query in queries:
+                if not query['sql'].lstrip().upper().startswith('SELECT'):
+                    continue
+                scans = self._seq_scans(query['sql'])
+                flagged += len(scans)
+                for scan in scans:
+                    self.stdout.write(self.style.WARNING(f'  {scan}'))
+                    self.stdout.write(f'    {query["sql"][:300]}')
+
+        if flagged and options['fail']:
+            raise CommandError(
+                f'Найдено последовательных сканирований: {flagged}'
+            )
+        self.stdout.write(f'Последовательных сканирований: {flagged}')
+
+    def _seq_scans(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN {sql}')
+                return [
+                    row[0].strip() for row in cursor.fetchall()
+                    if 'Seq Scan' in row[0]
+                ]
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [
+                row[-1] for row in cursor.fetchall()
+                if row[-1].startswith('SCAN') and 'USING' not in row[-1]
+            ]
@@ -0,0 +1,157 @@
+import random
+import string
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import similarity
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart)
+from users.models import Subscription, User
+
+
+SHORT_LINK_CHARS = string.ascii_letters + string.digits
+
+
+def zipf_index(count, rng):
+    """
+    Индекс 0..count-1 с распределением, близким к закону Ципфа (s=1).
+
+    P(rank <= k) ~ ln(k) / ln(count), поэтому rank = count ** U.
+    """
+    return min(int(count ** rng.random()), count) - 1
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, рецептами, '
+            'избранным, списками покупок и подписками для нагрузочных тестов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=10)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        ingredient_ids = self._ingredients()
+        user_ids = self._users(options['users'])
+        recipe_ids = self._recipes(
+            options['recipes'], user_ids, ingredient_ids,
+            options['ingredients_per_recipe']
+        )
+        self._relations(
+            Favorite, 'recipe_id', user_ids, recipe_ids,
+            options['favorites_per_user']
+        )
+        self._relations(
+            ShoppingCart, 'recipe_id', user_ids, recipe_ids,
+            options['cart_per_user']
+        )
+        self._relations(
+            Subscription, 'subscribed_to_id', user_ids, user_ids,
+            options['subscriptions_per_user'], exclude_self=True
+        )
+        # bulk_create не отправляет сигналы, индекс собирается целиком
+        similarity.build()
+        self.stdout.write('Индекс похожих рецептов собран')
+        self.stdout.write(self.style.SUCCESS('Данные успешно созданы!'))
+
+    def _ingredients(self):
+        if not Ingredient.objects.exists():
+            Ingredient.objects.bulk_create(
+                Ingredient(name=f'Ингредиент {i}', measurement_unit='г')
+                for i in range(2000)
+            )
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def _users(self, count):
+        password = make_password('synthetic')
+        start = User.objects.count()
+        users = (
+            User(username=f'synthetic{i}', email=f'synthetic{i}@example.com',
+                 first_name='Иван', last_name='Иванов', password=password)
+            for i in range(start, start + count)
+        )
+        ids = []
+        for batch in batched(users, self.batch_size):
+            ids.extend(
+                user.id for user in User.objects.bulk_create(batch)
+            )
+        self.stdout.write(f'Пользователей: {len(ids)}')
+        return ids
+
+    def _recipes(self, count, user_ids, ingredient_ids, per_recipe):
+        start = Recipe.objects.count()
+        recipe_ids = []
+        for batch in batched(range(start, start + count), self.batch_size):
+            with transaction.atomic():
+                recipes = Recipe.objects.bulk_create(
+                    Recipe(
+                        author_id=user_ids[
+                            zipf_index(len(user_ids), self.rng)
+                        ],
+                        name=f'Рецепт {i}',
+                        image=f'images/recipes/synthetic_{i % 100}.jpg',
+                        text='Нарезать, перемешать и запечь. ' * 10,
+                        cooking_time=self.rng.randint(5, 180),
+                        short_link=self._short_link(i)
+                    )
+                    for i in batch
+                )
+                IngredientRecipe.objects.bulk_create(
+                    IngredientRecipe(recipe_id=recipe.id,
+                                     ingredient_id=ingredient_id,
+                                     amount=self.rng.randint(1, 500))
+                    for recipe in recipes
+                    for ingredient_id in self.rng.sample(
+                        ingredient_ids, min(per_recipe, len(ingredient_ids))
+                    )
+                )
+            recipe_ids.extend(recipe.id for recipe in recipes)
+            self.stdout.write(f'Рецептов: {len(recipe_ids)}')
+        return recipe_ids
+
+    def _relations(self, model, field, user_ids, target_ids, per_user,
+                   exclude_self=False):
+        """Связи пользователь -> объект с популярностью по Ципфу."""
+        def objects():
+            for user_id in user_ids:
+                targets = {
+                    target_ids[zipf_index(len(target_ids), self.rng)]
+                    for _ in range(per_user)
+                }
+                if exclude_self:
+                    targets.discard(user_id)
+                for target_id in targets:
+                    yield model(user_id=user_id, **{field: target_id})
+
+        created = 0
+        for batch in batched(objects(), self.batch_size):
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            created += len(batch)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {created}')
+
+    def _short_link(self, number):
+        """Начинается с '-', поэтому не совпадает с get_short_link()."""
+        chars = []
+        while True:
+            number, rest = divmod(number, len(SHORT_LINK_CHARS))
+            chars.append(SHORT_LINK_CHARS[rest])
+            if not number:
+                break
+        return '-' + ''.join(chars)
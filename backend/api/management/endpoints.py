@@ -0,0 +1,45 @@
+from django.db.models import Count
+
+from recipes.models import Ingredient, Recipe
+from users.models import User
+
+
+# Основные GET-эндпоинты для проверок производительности
+ENDPOINTS = {
+    'feed': '/api/recipes/',
+    'feed_favorited': '/api/recipes/?is_favorited=1',
+    'feed_shopping_cart': '/api/recipes/?is_in_shopping_cart=1',
+    'author': '/api/recipes/?author={author_id}',
+    'detail': '/api/recipes/{recipe_id}/',
+    'subscriptions': '/api/users/subscriptions/?recipes_limit=3',
+    'download_shopping_cart': '/api/recipes/download_shopping_cart/',
+    'ingredient_search': '/api/ingredients/?name={ingredient_prefix}',
+}
+
+# Кэш для проверок SQL эндпоинтов (override_settings(CACHES=NO_CACHE)):
+# чтения из api.caching тоже выполняют свои запросы
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+def endpoint_context():
+    """
+    Пользователь и параметры для ENDPOINTS.
+
+    Берётся пользователь с наибольшим числом избранного, чтобы фильтры
+    и флаги работали на непустых данных. None, если база пуста.
+    """
+    user = (
+        User.objects.annotate(favorites_count=Count('favorites'))
+        .order_by('-favorites_count').first()
+    )
+    recipe = Recipe.objects.first()
+    ingredient = Ingredient.objects.first()
+    if user is None or recipe is None or ingredient is None:
+        return None, None
+    return user, {
+        'author_id': recipe.author_id,
+        'recipe_id': recipe.id,
+        'ingredient_prefix': ingredient.name[:3],
+    }
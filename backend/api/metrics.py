@@ -0,0 +1,166 @@
+"""
+Метрики запросов: число SQL-запросов, время SQL, сериализации и рендеринга.
+
+Значения текущего запроса хранятся в contextvar, накопленные по view -
+в счётчиках prometheus_client и отдаются по /metrics. Под gunicorn
+(см. gunicorn.conf.py) задан PROMETHEUS_MULTIPROC_DIR: счётчики каждого
+воркера пишутся в файлы этого каталога, и /metrics суммирует все процессы.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, generate_latest,
+                               multiprocess)
+
+
+STAGES = ('db', 'serialize', 'render', 'compress')
+# Служебные запросы transaction.atomic() не считаются SQL-запросами
+SAVEPOINT_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT',
+                      'ROLLBACK TO SAVEPOINT')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса."""
+
+    __slots__ = ('started', 'queries', 'timings', 'body_bytes',
+                 'sent_bytes')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.timings = dict.fromkeys(STAGES, 0.0)
+        # Размер тела до и после сжатия (см. CompressionMiddleware)
+        self.body_bytes = 0
+        self.sent_bytes = 0
+
+    @property
+    def duration(self):
+        return time.perf_counter() - self.started
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def add_timing(stage, seconds):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.timings[stage] += seconds
+
+
+@contextmanager
+def measure(stage):
+    """Добавляет время блока к этапу текущего запроса."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(stage, time.perf_counter() - start)
+
+
+def measured(stage):
+    """Декоратор-вариант measure()."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Обёртка из execute_wrappers каждого соединения (см. api.signals)."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if not sql.startswith(SAVEPOINT_PREFIXES):
+            metrics.queries += 1
+        metrics.timings['db'] += time.perf_counter() - start
+
+
+def server_timing(metrics, duration):
+    """Значение заголовка Server-Timing."""
+    parts = [
+        f'db;dur={metrics.timings["db"] * 1000:.1f};'
+        f'desc="{metrics.queries} queries"',
+        f'serialize;dur={metrics.timings["serialize"] * 1000:.1f}',
+        f'render;dur={metrics.timings["render"] * 1000:.1f}',
+        f'compress;dur={metrics.timings["compress"] * 1000:.1f}',
+        f'total;dur={duration * 1000:.1f}',
+    ]
+    return ', '.join(parts)
+
+
+# Суффикс _total счётчику добавляет prometheus_client
+PROMETHEUS_METRICS = (
+    ('foodgram_requests', 'Количество запросов', 'requests'),
+    ('foodgram_request_duration_seconds',
+     'Суммарное время обработки запросов', 'duration'),
+    ('foodgram_db_queries', 'Количество SQL-запросов', 'queries'),
+    ('foodgram_db_duration_seconds', 'Суммарное время SQL-запросов', 'db'),
+    ('foodgram_serialize_duration_seconds',
+     'Суммарное время сериализации', 'serialize'),
+    ('foodgram_render_duration_seconds',
+     'Суммарное время рендеринга ответа', 'render'),
+    ('foodgram_compress_duration_seconds',
+     'Суммарное время сжатия ответов', 'compress'),
+    ('foodgram_response_body_bytes',
+     'Размер тел ответов до сжатия', 'body_bytes'),
+    ('foodgram_response_sent_bytes',
+     'Размер тел ответов после сжатия', 'sent_bytes'),
+)
+
+_counters = {
+    key: Counter(name, description, ('method', 'view'))
+    for name, description, key in PROMETHEUS_METRICS
+}
+
+
+def record(method, view_name, metrics, duration):
+    values = {
+        'requests': 1,
+        'duration': duration,
+        'queries': metrics.queries,
+        'body_bytes': metrics.body_bytes,
+        'sent_bytes': metrics.sent_bytes,
+        **metrics.timings,
+    }
+    for key, value in values.items():
+        _counters[key].labels(method, view_name).inc(value)
+
+
+def _registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    # Сумма по файлам всех процессов, живых и завершившихся
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """Метрики всех процессов в текстовом формате Prometheus."""
+    return HttpResponse(
+        generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,215 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+
+from . import db_routers, metrics
+from .compression import ENCODINGS, compress, negotiate
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Эндпоинт выполнил больше SQL-запросов, чем разрешено бюджетом."""
+
+
+class RequestMetricsMiddleware:
+    """
+    Считает SQL-запросы и время этапов обработки каждого запроса.
+
+    Добавляет заголовок Server-Timing, накапливает метрики для /metrics
+    и сверяет число запросов с QUERY_BUDGETS. При QUERY_BUDGET_STRICT
+    превышение бюджета приводит к исключению, что роняет тесты.
+    SQL-запросы считает metrics.query_wrapper, подключаемый к каждому
+    соединению в api.signals, поэтому учитываются и запросы из
+    sync_to_async в асинхронных view.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        request_metrics, token = metrics.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        return self._finish(request, response, request_metrics)
+
+    async def __acall__(self, request):
+        request_metrics, token = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        return self._finish(request, response, request_metrics)
+
+    def _finish(self, request, response, request_metrics):
+        duration = request_metrics.duration
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        metrics.record(request.method, view_name, request_metrics, duration)
+        response['Server-Timing'] = metrics.server_timing(
+            request_metrics, duration
+        )
+        self._check_budget(
+            f'{request.method} {view_name}', request_metrics.queries
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # Вызывается прямо перед response.render()
+        started = time.perf_counter()
+        request_metrics = metrics.current()
+
+        def rendered(response):
+            if request_metrics is not None:
+                request_metrics.timings['render'] += (
+                    time.perf_counter() - started
+                )
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def _check_budget(self, endpoint, queries):
+        budget = settings.QUERY_BUDGETS.get(
+            endpoint, settings.QUERY_BUDGET_DEFAULT
+        )
+        if not budget or queries <= budget:
+            return
+        message = (
+            f'{endpoint}: {queries} SQL-запросов при бюджете {budget}'
+        )
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжимает ответы в br, zstd или gzip по Accept-Encoding клиента.
+
+    Не сжимаются ответы меньше COMPRESSION_MIN_SIZE, уже сжатые,
+    потоковые и с типом вне COMPRESSIBLE_CONTENT_TYPES (в том числе HTML
+    с CSRF-токеном, из-за атаки BREACH). Если у ответа есть атрибут
+    precompressed - готовые тела по кодировкам, - отдаётся готовое тело
+    без повторного сжатия. Время сжатия и размеры тел до и после
+    попадают в метрики запроса.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+
+        precompressed = getattr(response, 'precompressed', None) or {}
+        content_type = response.get('Content-Type', '').partition(';')[0]
+        if (not precompressed and content_type.strip()
+                not in settings.COMPRESSIBLE_CONTENT_TYPES):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        body = response.content
+        if not precompressed and len(body) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        encoding = negotiate(
+            request.headers.get('Accept-Encoding'),
+            precompressed or ENCODINGS
+        )
+        if encoding is None:
+            return response
+
+        if encoding in precompressed:
+            compressed = precompressed[encoding]
+        else:
+            with metrics.measure('compress'):
+                compressed = compress(body, encoding)
+            if len(compressed) >= len(body):
+                return response
+
+        request_metrics = metrics.current()
+        if request_metrics is not None:
+            request_metrics.body_bytes += len(body)
+            request_metrics.sent_bytes += len(compressed)
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # Сжатое тело не совпадает побайтно с исходным
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Разрешает чтение с реплик для GET-запросов к REPLICA_READ_VIEWSETS.
+
+    После запроса с записью клиент получает cookie REPLICA_STICKY_COOKIE
+    на REPLICA_STICKY_SECONDS, и пока она есть, его запросы читают с
+    основной БД: добавленное в избранное, корзину или подписки видно
+    сразу, даже если реплика отстаёт.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.viewsets = tuple(
+            import_string(path) for path in settings.REPLICA_READ_VIEWSETS
+        )
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        routing, token = db_routers.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            db_routers.finish_request(token)
+        return self._stick(routing, response)
+
+    async def __acall__(self, request):
+        routing, token = db_routers.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_routers.finish_request(token)
+        return self._stick(routing, response)
+
+    def _stick(self, routing, response):
+        if routing.wrote and settings.REPLICA_DATABASES:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # В асинхронном режиме метод выполняется в другом потоке с копией
+        # контекста, поэтому меняется сам объект, а не переменная контекста
+        routing = db_routers.current()
+        if (settings.REPLICA_DATABASES and routing is not None
+                and request.method in SAFE_METHODS
+                and settings.REPLICA_STICKY_COOKIE not in request.COOKIES
+                and getattr(view_func, 'cls', None) in self.viewsets):
+            routing.use_replica = True
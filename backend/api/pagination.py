@@ -1,3 +1,5 @@
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 
 from constants import PAGE_SIZE
@@ -6,3 +8,25 @@ from constants import PAGE_SIZE
 class CustomPagePagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = PAGE_SIZE
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        paginate_queryset для асинхронных view: count и страница через
+        async ORM.
+        """
+        self.request = request
+        paginator = self.django_paginator_class(
+            queryset, self.get_page_size(request)
+        )
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        return [row async for row in self.page.object_list]
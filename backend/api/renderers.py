@@ -0,0 +1,41 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson, если он установлен.
+
+    Пишет bytes напрямую, без промежуточной строки. Типы, которые orjson
+    не знает или форматирует иначе (datetime, Decimal, lazy-строки),
+    отдаются в encoder_class DRF, поэтому ответ совпадает с JSONRenderer.
+    Отступы (Browsable API, ?indent=) и нестандартные настройки
+    обрабатывает стандартный JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+        # Как и JSONRenderer, экранируем U+2028 и U+2029
+        if b'\xe2\x80' in ret:
+            ret = (ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+                   .replace(b'\xe2\x80\xa9', b'\\u2029'))
+        return ret
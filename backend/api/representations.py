@@ -0,0 +1,349 @@
+"""
+Сборка ответов горячих GET-эндпоинтов без ModelSerializer.
+
+JSON совпадает с RecipeDetailViewSerializer, IngredientSerializer и
+SubscriptionUserSerializer, но данные берутся из строк .values()
+несколькими запросами на всю страницу, а не запросами на каждый объект.
+
+?fields= и ?omit= (имена через запятую) отбирают поля верхнего уровня.
+Запросы и колонки, нужные только отброшенным полям, не выполняются:
+без author не читаются авторы, без ingredients - ингредиенты.
+
+Не зависящие от пользователя данные рецепта (строка и ингредиенты)
+кэшируются через api.caching, см. cached_recipe().
+"""
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from djoser.serializers import UserSerializer
+
+from constants import RECIPE_CACHE_SECONDS
+from recipes.models import (Favorite, IngredientRecipe, Recipe,
+                            ShoppingCart)
+from users.models import Subscription, User
+from . import caching
+from .metrics import measured
+
+
+USER_FIELDS = (*UserSerializer.Meta.fields, 'avatar')
+RECIPE_FIELDS = ('id', 'author_id', 'name', 'image', 'text', 'cooking_time')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+
+# Поля ответов в порядке сериализаторов
+USER_OUTPUT = (*UserSerializer.Meta.fields, 'is_subscribed', 'avatar')
+SUBSCRIPTION_OUTPUT = (*USER_OUTPUT, 'recipes', 'recipes_count')
+RECIPE_OUTPUT = ('id', 'author', 'ingredients', 'is_favorited',
+                 'is_in_shopping_cart', 'name', 'image', 'text',
+                 'cooking_time')
+
+AVATAR_STORAGE = User._meta.get_field('avatar').storage
+IMAGE_STORAGE = Recipe._meta.get_field('image').storage
+
+
+def _names(params, key):
+    names = {
+        name.strip()
+        for value in params.getlist(key)
+        for name in value.split(',')
+    }
+    names.discard('')
+    return names
+
+
+def selected_fields(request, available):
+    """
+    Поля из available, оставленные ?fields= и ?omit=.
+
+    Незнакомые имена игнорируются, пустой ?fields= равен его отсутствию.
+    """
+    if request is None:
+        return available
+    params = getattr(request, 'query_params', request.GET)
+    include = _names(params, 'fields')
+    omit = _names(params, 'omit')
+    return tuple(
+        field for field in available
+        if (not include or field in include) and field not in omit
+    )
+
+
+def recipe_columns(request):
+    """Колонки RECIPE_FIELDS, нужные выбранным полям рецепта."""
+    fields = selected_fields(request, RECIPE_OUTPUT)
+    return tuple(
+        column for column in RECIPE_FIELDS
+        if column == 'id'
+        or (column == 'author_id' and 'author' in fields)
+        or column in fields
+    )
+
+
+def subscription_columns(request):
+    """Колонки USER_FIELDS, нужные выбранным полям подписки."""
+    fields = selected_fields(request, SUBSCRIPTION_OUTPUT)
+    return tuple(
+        column for column in USER_FIELDS if column == 'id' or column in fields
+    )
+
+
+def _file_url(storage, name, request):
+    """То же, что ImageField.to_representation в DRF."""
+    if not name:
+        return None
+    url = storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def _viewer(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    return None
+
+
+def _user_data(row, subscribed, request, fields=USER_OUTPUT):
+    data = {}
+    for field in fields:
+        if field == 'is_subscribed':
+            data[field] = row['id'] in subscribed
+        elif field == 'avatar':
+            data[field] = _file_url(AVATAR_STORAGE, row['avatar'], request)
+        else:
+            data[field] = row[field]
+    return data
+
+
+def _subscribed_query(viewer, user_ids):
+    """Условие UserDetailSerializer.get_is_subscribed для пачки авторов."""
+    if viewer is None:
+        return Subscription.objects.none()
+    return (
+        Subscription.objects
+        .filter(user_id__in=user_ids, user=viewer)
+        .values_list('user_id', flat=True)
+    )
+
+
+def _recipe_ids_query(model, viewer, recipe_ids):
+    if viewer is None:
+        return model.objects.none()
+    return (
+        model.objects
+        .filter(user=viewer, recipe_id__in=recipe_ids)
+        .values_list('recipe_id', flat=True)
+    )
+
+
+def _ingredients_query(recipe_ids):
+    return (
+        IngredientRecipe.objects
+        .filter(recipe_id__in=recipe_ids)
+        .order_by('id')
+        .values_list('recipe_id', 'ingredient_id', 'ingredient__name',
+                     'ingredient__measurement_unit', 'amount')
+    )
+
+
+def _recipe_queries(rows, viewer, fields):
+    """
+    Запросы для страницы рецептов, выполняет их вызывающая сторона.
+    Запросы отброшенных полей не строятся.
+    """
+    recipe_ids = [row['id'] for row in rows]
+    queries = {}
+    if 'author' in fields:
+        author_ids = {row['author_id'] for row in rows}
+        queries['authors'] = (
+            User.objects.filter(id__in=author_ids).values(*USER_FIELDS)
+        )
+        queries['subscribed'] = _subscribed_query(viewer, author_ids)
+    if 'ingredients' in fields:
+        queries['ingredients'] = _ingredients_query(recipe_ids)
+    if 'is_favorited' in fields:
+        queries['favorited'] = _recipe_ids_query(Favorite, viewer, recipe_ids)
+    if 'is_in_shopping_cart' in fields:
+        queries['in_cart'] = _recipe_ids_query(ShoppingCart, viewer,
+                                               recipe_ids)
+    return queries
+
+
+@measured('serialize')
+def _build_recipes(rows, fetched, request, fields):
+    subscribed = set(fetched.get('subscribed', ()))
+    authors = {
+        row['id']: _user_data(row, subscribed, request)
+        for row in fetched.get('authors', ())
+    }
+
+    ingredients = defaultdict(list)
+    for recipe_id, ingredient_id, name, unit, amount in fetched.get(
+        'ingredients', ()
+    ):
+        ingredients[recipe_id].append({
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': unit,
+            'amount': amount
+        })
+
+    favorited = set(fetched.get('favorited', ()))
+    in_cart = set(fetched.get('in_cart', ()))
+
+    values = {
+        'id': lambda row: row['id'],
+        'author': lambda row: authors[row['author_id']],
+        'ingredients': lambda row: ingredients[row['id']],
+        'is_favorited': lambda row: row['id'] in favorited,
+        'is_in_shopping_cart': lambda row: row['id'] in in_cart,
+        'name': lambda row: row['name'],
+        'image': lambda row: _file_url(IMAGE_STORAGE, row['image'], request),
+        'text': lambda row: row['text'],
+        'cooking_time': lambda row: row['cooking_time'],
+    }
+    getters = [(field, values[field]) for field in fields]
+    return [
+        {field: getter(row) for field, getter in getters}
+        for row in rows
+    ]
+
+
+def recipes_data(rows, request, fetched=None):
+    """
+    Рецепты в формате RecipeDetailViewSerializer из строк RECIPE_FIELDS
+    (или recipe_columns(request), если задан ?fields= или ?omit=).
+    Запросы для ключей fetched (например, ingredients из кэша) не
+    выполняются.
+    """
+    rows = list(rows)
+    fields = selected_fields(request, RECIPE_OUTPUT)
+    fetched = dict(fetched or {})
+    for key, query in _recipe_queries(rows, _viewer(request),
+                                      fields).items():
+        if key not in fetched:
+            fetched[key] = list(query)
+    return _build_recipes(rows, fetched, request, fields)
+
+
+async def arecipes_data(rows, request, fetched=None):
+    """Асинхронный вариант recipes_data для строк, уже выбранных из БД."""
+    fields = selected_fields(request, RECIPE_OUTPUT)
+    fetched = dict(fetched or {})
+    for key, query in _recipe_queries(rows, _viewer(request),
+                                      fields).items():
+        if key not in fetched:
+            fetched[key] = [item async for item in query]
+    return _build_recipes(rows, fetched, request, fields)
+
+
+def recipe_cache_key(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def _shared_recipe(recipe_id):
+    # Для кэша - с основной БД (см. api.caching)
+    row = (
+        Recipe.objects.using(DEFAULT_DB_ALIAS).filter(pk=recipe_id)
+        .values(*RECIPE_FIELDS).first()
+    )
+    if row is None:
+        return None
+    return {
+        'row': row,
+        'ingredients': list(
+            _ingredients_query([recipe_id]).using(DEFAULT_DB_ALIAS)
+        )
+    }
+
+
+def cached_recipe(recipe_id, viewer_id=None):
+    """
+    Строка рецепта и его ингредиенты или None, если рецепта нет.
+
+    Автор получает данные из БД: при кэше в памяти процесса сброс после
+    правки не доходит до других воркеров, а свою правку он должен
+    видеть сразу. Переименование ингредиента видно после срока кэша.
+    """
+    computed = []
+
+    def compute():
+        computed.append(True)
+        return _shared_recipe(recipe_id)
+
+    shared = caching.get_or_compute(recipe_cache_key(recipe_id), compute,
+                                    RECIPE_CACHE_SECONDS)
+    if (shared is not None and not computed and viewer_id is not None
+            and shared['row']['author_id'] == viewer_id):
+        shared = _shared_recipe(recipe_id)
+    return shared
+
+
+@measured('serialize')
+def subscriptions_data(rows, request):
+    """
+    Авторы в формате SubscriptionUserSerializer из строк USER_FIELDS
+    (или subscription_columns(request)).
+    """
+    rows = list(rows)
+    fields = selected_fields(request, SUBSCRIPTION_OUTPUT)
+    user_fields = [field for field in fields if field in USER_OUTPUT]
+    user_ids = [row['id'] for row in rows]
+    subscribed = set()
+    if 'is_subscribed' in fields:
+        subscribed = set(_subscribed_query(_viewer(request), user_ids))
+
+    recipes_by_author = defaultdict(list)
+    if 'recipes' in fields:
+        recipes_by_author = _author_recipes(user_ids, request)
+
+    recipes_count = {}
+    if 'recipes_count' in fields:
+        recipes_count = dict(
+            Recipe.objects
+            .filter(author_id__in=user_ids)
+            .order_by()
+            .values('author_id')
+            .annotate(count=Count('id'))
+            .values_list('author_id', 'count')
+        )
+
+    data = []
+    for row in rows:
+        user = _user_data(row, subscribed, request, user_fields)
+        if 'recipes' in fields:
+            user['recipes'] = recipes_by_author[row['id']]
+        if 'recipes_count' in fields:
+            user['recipes_count'] = recipes_count.get(row['id'], 0)
+        data.append(user)
+    return data
+
+
+def _author_recipes(user_ids, request):
+    """Краткие рецепты авторов с учётом ?recipes_limit=."""
+    recipes = (
+        Recipe.objects
+        .filter(author_id__in=user_ids)
+        .values('id', 'author_id', 'name', 'image', 'cooking_time')
+    )
+    limit = request.query_params.get('recipes_limit')
+    if limit is not None and limit.isdigit():
+        recipes = recipes.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('pub_date').desc()
+            )
+        ).filter(row_number__lte=int(limit))
+
+    recipes_by_author = defaultdict(list)
+    for recipe in recipes:
+        recipes_by_author[recipe['author_id']].append({
+            'id': recipe['id'],
+            'name': recipe['name'],
+            'image': _file_url(IMAGE_STORAGE, recipe['image'], request),
+            'cooking_time': recipe['cooking_time']
+        })
+    return recipes_by_author
@@ -1,16 +1,42 @@
 from django.db import transaction
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
 from constants import MIN_WEIGHT_INGREDIENT, MAX_WEIGHT_INGREDIENT
 from recipes.models import (IngredientRecipe, Recipe, Ingredient,
                             Favorite, ShoppingCart)
 from users.models import User, Subscription
+from .authentication import get_jwt_for_user
 from .fields import Base64ImageField
+from .representations import selected_fields
+from .utils import insert_or_none
 
 
-class UserDetailSerializer(UserSerializer):
+class SparseFieldsMixin:
+    """
+    ?fields= и ?omit= для GET: у сериализатора верхнего уровня остаются
+    только выбранные поля, SerializerMethodField отброшенных полей
+    не выполняют запросов. Вложенные сериализаторы не затрагиваются.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if (parent is not None or request is None
+                or request.method not in ('GET', 'HEAD')):
+            return fields
+        return {name: fields[name]
+                for name in selected_fields(request, tuple(fields))}
+
+
+class UserDetailSerializer(SparseFieldsMixin, UserSerializer):
     """Сериализатор для детального отображения пользователя."""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -173,7 +199,8 @@ class IngredientInRecipeReadSerializer(serializers.ModelSerializer):
         ]
 
 
-class RecipeDetailViewSerializer(serializers.ModelSerializer):
+class RecipeDetailViewSerializer(SparseFieldsMixin,
+                                 serializers.ModelSerializer):
     """Сериализатор для модели Recipe при GET-запросах."""
 
     author = UserDetailSerializer()
@@ -235,16 +262,16 @@ class FavoriteViewSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ('user', 'recipe')
 
-    def validate(self, data):
-        user = self.context['request'].user
+    def create(self, data):
         recipe = self.context['recipe']
-        model = self.context['model']
-
-        if model.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError(
-                f'Рецепт "{recipe.name}" уже добавлен.'
-            )
-        return data
+        instance = insert_or_none(self.context['model'], **data)
+        if instance is None:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'Рецепт "{recipe.name}" уже добавлен.'
+                ]
+            })
+        return instance
 
     def to_representation(self, data):
         return RecipeBriefSerializer(data.recipe, context=self.context).data
@@ -261,15 +288,16 @@ class ShoppingCartViewSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ('user', 'recipe')
 
-    def validate(self, data):
-        user = self.context.get('request').user
+    def create(self, data):
         recipe = self.context.get('recipe')
-        model = self.context.get('model')
-        if model.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError(
-                f'Рецепт - {recipe.name} уже добавлен!'
-            )
-        return data
+        instance = insert_or_none(self.context.get('model'), **data)
+        if instance is None:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'Рецепт - {recipe.name} уже добавлен!'
+                ]
+            })
+        return instance
 
     def to_representation(self, obj):
         serializer = RecipeBriefSerializer(obj.recipe)
@@ -291,13 +319,18 @@ class SubscriperViewSerializer(serializers.ModelSerializer):
         if user == subscribed_to:
             raise serializers.ValidationError('Нельзя подписаться на себя!')
 
-        if Subscription.objects.filter(user=user, subscribed_to=subscribed_to).exists():
-            raise serializers.ValidationError(
-                f'Вы уже подписаны на {subscribed_to.username}!'
-            )
-
         return data
 
+    def create(self, data):
+        instance = insert_or_none(Subscription, **data)
+        if instance is None:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'Вы уже подписаны на {data["subscribed_to"].username}!'
+                ]
+            })
+        return instance
+
     def to_representation(self, instance):
         serializer = SubscriptionUserSerializer(
             instance.subscribed_to,
@@ -325,3 +358,28 @@ class SubscriptionUserSerializer(UserDetailSerializer):
             queryset = queryset[:int(limit)]
 
         return RecipeBriefSerializer(queryset, many=True, context=self.context).data
+
+
+class JWTRefreshSerializer(serializers.Serializer):
+    """
+    Обновление пары JWT.
+
+    Claims пользователя перечитываются из БД, поэтому смена имени
+    или деактивация попадают в токены не позже следующего обновления.
+    """
+
+    refresh = serializers.CharField()
+
+    def validate(self, data):
+        token = RefreshToken(data['refresh'])
+        user = User.objects.filter(
+            pk=token[jwt_settings.USER_ID_CLAIM], is_active=True
+        ).first()
+        if user is None:
+            raise AuthenticationFailed('User inactive or deleted.')
+
+        refresh = get_jwt_for_user(user)
+        return {
+            'auth_token': str(refresh.access_token),
+            'refresh': str(refresh)
+        }
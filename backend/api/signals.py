@@ -0,0 +1,110 @@
+from functools import partial
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from background.queue import enqueue_on_commit
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from users.models import Subscription, User
+from . import caching, events, snapshots, sync
+from .authentication import invalidate_token, invalidate_user_tokens
+from .db_routers import write_wrapper
+from .metrics import query_wrapper
+from .representations import recipe_cache_key
+from .tasks import update_similarity_index
+from .utils import short_link_cache_key
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """
+    Выход через djoser token/logout удаляет токен. Сброс после фиксации:
+    до неё параллельный запрос ещё видит токен в БД.
+    """
+    transaction.on_commit(partial(invalidate_token, instance.key))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    """Смена пароля, деактивация и правка профиля."""
+    if not created:
+        transaction.on_commit(partial(invalidate_user_tokens, instance.pk))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """
+    Следующий запрос снимка справочника соберёт новую версию, поиск
+    ингредиентов перейдёт на новое поколение ключей. Сброс после
+    фиксации: иначе запрос между сбросом и фиксацией закэшировал бы
+    старые данные.
+    """
+    transaction.on_commit(snapshots.invalidate)
+    transaction.on_commit(partial(caching.bump, 'ingredients'))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    """
+    Индекс похожих рецептов обновляет воркер.
+
+    Ингредиенты сохраняются после рецепта, но задача читает их уже после
+    фиксации транзакции. Ключа нет: правка во время выполнения задачи
+    по тому же рецепту не должна потеряться.
+    """
+    enqueue_on_commit(update_similarity_index, {'recipe_id': instance.pk})
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, using, **kwargs):
+    """
+    Событие потока новых рецептов (api.events) для любого способа
+    создания, в том числе из админки. После фиксации: подписчик сразу
+    перечитает рецепт.
+    """
+    if created:
+        transaction.on_commit(partial(events.publish, instance), using=using)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_cache_reset(sender, instance, **kwargs):
+    """
+    Кэш рецепта и его короткой ссылки (в том числе закэшированное
+    отсутствие ссылки до создания рецепта). Правка ингредиентов
+    сохраняет и сам рецепт.
+    """
+    caching.invalidate_on_commit(recipe_cache_key(instance.pk),
+                                 short_link_cache_key(instance.short_link))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+def synced_saved(sender, instance, **kwargs):
+    """Журнал изменений для GET /api/sync/."""
+    sync.record(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+def synced_deleted(sender, instance, **kwargs):
+    sync.record(instance, deleted=True)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """Подсчёт SQL-запросов и отслеживание записи для ReplicaRouter."""
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+    if (connection.alias == DEFAULT_DB_ALIAS
+            and write_wrapper not in connection.execute_wrappers):
+        connection.execute_wrappers.append(write_wrapper)
@@ -0,0 +1,428 @@
+"""
+Индекс рецептов по наборам ингредиентов: похожие рецепты и подбор
+рецептов по имеющимся продуктам.
+
+Основной сегмент - разреженная матрица рецепт × ингредиент в формате CSR
+и обратные списки ингредиент → строки рецептов. Массивы лежат в .npy в
+INDEX_ROOT, воркеры открывают их через mmap и делят одну копию в page
+cache. Изменённые рецепты попадают в небольшой дельта-сегмент, их строки
+в основном сегменте при поиске не учитываются. Когда дельта разрастается
+до SIMILARITY_MAX_DELTA рецептов, индекс пересобирается целиком.
+
+Похожесть - коэффициент Жаккара: общие ингредиенты / все ингредиенты
+двух рецептов. Кандидатов дают обратные списки редких ингредиентов
+запроса, поэтому время поиска не растёт с размером каталога. Подбор по
+продуктам ранжирует по доле ингредиентов рецепта, которые уже есть.
+"""
+import fcntl
+import itertools
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from constants import SIMILARITY_MAX_DELTA
+from recipes.models import IngredientRecipe
+
+BASE_ARRAYS = ('ids', 'indptr', 'indices', 'keys', 'postptr', 'postings',
+               'frequent', 'masks')
+DELTA_ARRAYS = ('delta_ids', 'delta_indptr', 'delta_indices', 'removed')
+# Меняется вместе с набором массивов: старые поколения лежат в другом
+# каталоге, и новый код их не открывает
+FORMAT = 2
+CURRENT_FILE = 'current'
+LOCK_FILE = 'lock'
+CHUNK_SIZE = 10000
+# Самые частые ингредиенты хранятся ещё и битовой маской каждого рецепта
+FREQUENT_BITS = 64
+MAX_CANDIDATES = 10000
+
+# (поколение, Index) последнего открытого индекса в процессе
+_loaded = None
+
+
+def _root():
+    return Path(settings.INDEX_ROOT) / f'similarity.v{FORMAT}'
+
+
+def _csr(recipe_ids, ingredient_ids):
+    """Пары (рецепт, ингредиент) -> id рецептов, indptr и indices."""
+    order = np.lexsort((ingredient_ids, recipe_ids))
+    recipe_ids = recipe_ids[order]
+    ids, starts = np.unique(recipe_ids, return_index=True)
+    indptr = np.append(starts, len(recipe_ids)).astype(np.int64)
+    return ids, indptr, ingredient_ids[order]
+
+
+def base_arrays(recipe_ids, ingredient_ids):
+    """Массивы основного сегмента из пар (рецепт, ингредиент)."""
+    ids, indptr, indices = _csr(recipe_ids, ingredient_ids)
+    rows = np.repeat(
+        np.arange(len(ids), dtype=np.int32), np.diff(indptr)
+    )
+    order = np.argsort(indices, kind='stable')
+    keys, starts = np.unique(indices[order], return_index=True)
+    postptr = np.append(starts, len(order)).astype(np.int64)
+
+    frequent = np.sort(
+        np.argsort(-np.diff(postptr), kind='stable')[:FREQUENT_BITS]
+    )
+    bits = np.full(len(keys), -1, dtype=np.int64)
+    bits[frequent] = np.arange(len(frequent))
+    element_bits = bits[np.searchsorted(keys, indices)]
+    found = element_bits >= 0
+    masks = np.zeros(len(ids), dtype=np.uint64)
+    np.bitwise_or.at(
+        masks, rows[found],
+        np.left_shift(np.uint64(1), element_bits[found].astype(np.uint64))
+    )
+    return {
+        'ids': ids,
+        'indptr': indptr,
+        'indices': indices,
+        'keys': keys,
+        'postptr': postptr,
+        'postings': rows[order],
+        'frequent': frequent,
+        'masks': masks,
+        **_empty_delta(),
+    }
+
+
+def _empty_delta():
+    return {
+        'delta_ids': np.empty(0, np.int64),
+        'delta_indptr': np.zeros(1, np.int64),
+        'delta_indices': np.empty(0, np.int64),
+        'removed': np.empty(0, np.int64),
+    }
+
+
+def _pairs(queryset):
+    """Пары (рецепт, ингредиент) из БД без промежуточных кортежей в памяти."""
+    rows = (
+        queryset.using(DEFAULT_DB_ALIAS)
+        .order_by()
+        .values_list('recipe_id', 'ingredient_id')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64)
+    return flat[0::2], flat[1::2]
+
+
+class Index:
+    """Поиск по массивам индекса, в том числе открытым через mmap."""
+
+    def __init__(self, arrays):
+        for name in BASE_ARRAYS + DELTA_ARRAYS:
+            setattr(self, name, arrays[name])
+        # Строки основного сегмента, заменённые дельтой или удалённые
+        self.dead = np.zeros(len(self.ids), dtype=bool)
+        self.dead[self._rows(self.ids, self.removed)] = True
+        self.sizes = np.diff(self.indptr)
+
+    @classmethod
+    def load(cls, path):
+        return cls({
+            name: np.load(path / f'{name}.npy', mmap_mode='r')
+            for name in BASE_ARRAYS + DELTA_ARRAYS
+        })
+
+    @classmethod
+    def empty(cls):
+        return cls(base_arrays(np.empty(0, np.int64), np.empty(0, np.int64)))
+
+    @staticmethod
+    def _rows(ids, values):
+        """Позиции values в отсортированном ids (без отсутствующих)."""
+        positions = np.searchsorted(ids, values)
+        found = positions < len(ids)
+        positions = positions[found]
+        return positions[ids[positions] == np.asarray(values)[found]]
+
+    def ingredients(self, recipe_id):
+        """Ингредиенты рецепта из индекса или None, если его там нет."""
+        for ids, indptr, indices, dead in (
+            (self.delta_ids, self.delta_indptr, self.delta_indices, None),
+            (self.ids, self.indptr, self.indices, self.dead),
+        ):
+            rows = self._rows(ids, [recipe_id])
+            if len(rows) and (dead is None or not dead[rows[0]]):
+                return indices[indptr[rows[0]]:indptr[rows[0] + 1]]
+        return None
+
+    def _candidates(self, keys):
+        """
+        Строки-кандидаты основного сегмента и число общих ингредиентов.
+
+        Кандидатов дают самые редкие ингредиенты запроса, пока их обратные
+        списки в сумме не длиннее MAX_CANDIDATES. Частые ингредиенты
+        вроде соли только добавляют совпадения найденным кандидатам:
+        списки отсортированы, поэтому это бинарный поиск.
+        """
+        starts, ends = self.postptr[keys], self.postptr[keys + 1]
+        order = np.argsort(ends - starts, kind='stable')
+        total = np.cumsum((ends - starts)[order])
+        rare = max(1, np.searchsorted(total, MAX_CANDIDATES, side='right'))
+        rows, overlap = np.unique(np.concatenate([
+            # У самого редкого ингредиента берутся самые новые рецепты
+            self.postings[max(starts[key], ends[key] - MAX_CANDIDATES):
+                          ends[key]]
+            for key in order[:rare]
+        ]), return_counts=True)
+        for key in order[rare:]:
+            postings = self.postings[starts[key]:ends[key]]
+            positions = np.minimum(np.searchsorted(postings, rows),
+                                   len(postings) - 1)
+            overlap += postings[positions] == rows
+        if len(self.removed):
+            alive = ~self.dead[rows]
+            rows, overlap = rows[alive], overlap[alive]
+        return rows, overlap
+
+    def _delta_overlap(self, query):
+        """Рецепты дельты с ингредиентами из query: id, общих, всего."""
+        if not len(self.delta_ids):
+            return (np.empty(0, np.int64),) * 3
+        hits = np.isin(self.delta_indices, query).astype(np.int64)
+        overlap = np.add.reduceat(hits, self.delta_indptr[:-1])
+        found = overlap > 0
+        return (np.asarray(self.delta_ids)[found], overlap[found],
+                np.diff(self.delta_indptr)[found])
+
+    def _base_overlap(self, rows, overlap):
+        return self.ids[rows], overlap, self.sizes[rows]
+
+    @staticmethod
+    def _top(limit, *keys):
+        """
+        Позиции limit лучших по keys, все по убыванию, первый - главный.
+
+        Значения, равные limit-му по главному ключу, остаются все, чтобы
+        выбор между ними решали следующие ключи, а не порядок в индексе.
+        """
+        positions = np.arange(len(keys[0]))
+        if len(positions) > limit:
+            threshold = -np.partition(-keys[0], limit - 1)[limit - 1]
+            positions = np.flatnonzero(keys[0] >= threshold)
+        order = np.lexsort([key[positions] for key in reversed(keys)])
+        return positions[order[::-1][:limit]]
+
+    def _owned(self, keys, limit):
+        """
+        Строки основного сегмента с наибольшей долей ингредиентов из keys
+        и сколько из них у рецепта есть.
+
+        Рецепт из одних частых ингредиентов может оказаться наверху,
+        поэтому доля считается для всего сегмента сразу. Редкие
+        ингредиенты считаются bincount по обратным спискам, частые -
+        popcount масок рецептов: обратный список соли длиной почти в весь
+        каталог не читается.
+        """
+        frequent = np.isin(keys, self.frequent)
+        if frequent.all():
+            counts = np.zeros(len(self.ids), dtype=np.int64)
+        else:
+            counts = np.bincount(np.concatenate([
+                self.postings[self.postptr[key]:self.postptr[key + 1]]
+                for key in keys[~frequent]
+            ]), minlength=len(self.ids))
+        if frequent.any():
+            bits = np.searchsorted(self.frequent, keys[frequent])
+            mask = np.bitwise_or.reduce(
+                np.left_shift(np.uint64(1), bits.astype(np.uint64))
+            )
+            counts += np.bitwise_count(self.masks & mask)
+        coverage = counts / self.sizes
+        if len(self.removed):
+            coverage[self.dead] = 0
+        # Дальше идут только строки с долей не ниже limit-й
+        threshold = 0
+        if len(coverage) > limit:
+            threshold = np.partition(coverage, -limit)[-limit]
+        rows = np.flatnonzero(
+            coverage >= threshold if threshold > 0 else coverage > 0
+        )
+        return rows, counts[rows]
+
+    def similar(self, recipe_id, ingredients, limit):
+        """id рецептов по убыванию похожести на набор ingredients."""
+        query = np.unique(np.asarray(ingredients, dtype=np.int64))
+        parts = [self._delta_overlap(query)]
+        keys = self._rows(self.keys, query)
+        if len(keys):
+            parts.append(self._base_overlap(*self._candidates(keys)))
+        ids, overlap, sizes = map(np.concatenate, zip(*parts))
+        keep = ids != recipe_id
+        ids, overlap, sizes = ids[keep], overlap[keep], sizes[keep]
+        scores = overlap / (len(query) + sizes - overlap)
+        # При равной похожести первыми идут более новые рецепты
+        return ids[self._top(limit, scores, ids)].tolist()
+
+    def pantry(self, ingredients, limit):
+        """
+        Рецепты, которые лучше всего покрывает набор продуктов.
+
+        Порядок - по доле имеющихся ингредиентов рецепта, затем по числу
+        недостающих. Возвращает список (id, есть, всего).
+        """
+        query = np.unique(np.asarray(ingredients, dtype=np.int64))
+        parts = [self._delta_overlap(query)]
+        keys = self._rows(self.keys, query)
+        if len(keys):
+            parts.append(self._base_overlap(*self._owned(keys, limit)))
+        ids, owned, sizes = map(np.concatenate, zip(*parts))
+        top = self._top(limit, owned / sizes, owned - sizes, ids)
+        return list(zip(ids[top].tolist(), owned[top].tolist(),
+                        sizes[top].tolist()))
+
+
+def _read_current():
+    try:
+        return (_root() / CURRENT_FILE).read_text()
+    except FileNotFoundError:
+        return None
+
+
+def _load(generation):
+    """
+    (поколение, Index). Пока процесс читал указатель, поколение могли
+    заменить дважды и удалить: тогда указатель читается заново. Уже
+    открытые через mmap файлы удаление не затрагивает.
+    """
+    while generation is not None:
+        try:
+            return generation, Index.load(_root() / generation)
+        except FileNotFoundError:
+            current = _read_current()
+            if current == generation:
+                raise
+            generation = current
+    return None, Index.empty()
+
+
+def get_index():
+    """Текущий индекс; новое поколение открывается при первом обращении."""
+    global _loaded
+    generation = _read_current()
+    if _loaded is None or _loaded[0] != generation:
+        _loaded = _load(generation)
+    return _loaded[1]
+
+
+def pantry_recipes(ingredients, limit):
+    return get_index().pantry(ingredients, limit)
+
+
+def similar_recipes(recipe_id, limit):
+    index = get_index()
+    ingredients = index.ingredients(recipe_id)
+    if ingredients is None:
+        # Рецепт ещё не попал в индекс: задача обновления в очереди
+        ingredients = list(
+            IngredientRecipe.objects
+            .filter(recipe_id=recipe_id)
+            .values_list('ingredient_id', flat=True)
+        )
+    return index.similar(recipe_id, ingredients, limit)
+
+
+@contextmanager
+def _lock():
+    """Поколения пишет один процесс за раз, остальные ждут."""
+    root = _root()
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / LOCK_FILE, 'w') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def _publish(arrays, base=None):
+    """
+    Записывает новое поколение и делает его текущим.
+
+    Файлы основного сегмента при обновлении дельты не копируются, а
+    связываются жёсткими ссылками с файлами поколения base.
+    """
+    root = _root()
+    previous = _read_current()
+    path = Path(tempfile.mkdtemp(dir=root, prefix='tmp-'))
+    for name, array in arrays.items():
+        np.save(path / f'{name}.npy', array)
+    if base is not None:
+        for name in BASE_ARRAYS:
+            os.link(base / f'{name}.npy', path / f'{name}.npy')
+    generation = f'{time.time_ns():x}'
+    path.rename(root / generation)
+    fd, tmp_path = tempfile.mkstemp(dir=root)
+    with os.fdopen(fd, 'w') as file:
+        file.write(generation)
+    os.replace(tmp_path, root / CURRENT_FILE)
+
+    # Предыдущее поколение могут ещё открывать воркеры, прочитавшие
+    # указатель до замены; более старые они откроют заново (см. _load)
+    keep = {generation, previous, CURRENT_FILE, LOCK_FILE}
+    for child in root.iterdir():
+        if child.name not in keep:
+            if child.is_dir():
+                shutil.rmtree(child, ignore_errors=True)
+            else:
+                child.unlink(missing_ok=True)
+    return generation
+
+
+def build():
+    """Собирает индекс по всем рецептам основной БД."""
+    with _lock():
+        return _build()
+
+
+def _build():
+    arrays = base_arrays(*_pairs(IngredientRecipe.objects.all()))
+    return _publish(arrays)
+
+
+def update(recipe_ids):
+    """
+    Переносит рецепты recipe_ids в дельта-сегмент.
+
+    Подходит и для новых, и для изменённых, и для удалённых рецептов:
+    их строки основного сегмента отбрасываются, а в дельту попадает
+    текущий набор ингредиентов из БД.
+    """
+    changed = np.unique(np.asarray(recipe_ids, dtype=np.int64))
+    with _lock():
+        generation = _read_current()
+        if generation is None:
+            return _build()
+        base = _root() / generation
+        index = Index.load(base)
+        kept = ~np.isin(index.delta_ids, changed)
+        if np.count_nonzero(kept) + len(changed) > SIMILARITY_MAX_DELTA:
+            return _build()
+
+        lengths = np.diff(index.delta_indptr)
+        old_recipes = np.repeat(index.delta_ids, lengths)
+        old_kept = np.repeat(kept, lengths)
+        new_recipes, new_ingredients = _pairs(
+            IngredientRecipe.objects.filter(recipe_id__in=changed.tolist())
+        )
+        ids, indptr, indices = _csr(
+            np.concatenate([old_recipes[old_kept], new_recipes]),
+            np.concatenate([index.delta_indices[old_kept], new_ingredients]),
+        )
+        return _publish({
+            'delta_ids': ids,
+            'delta_indptr': indptr,
+            'delta_indices': indices,
+            'removed': np.union1d(index.removed, changed),
+        }, base=base)
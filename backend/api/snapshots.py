@@ -0,0 +1,100 @@
+"""
+Снимок справочника ингредиентов для загрузки фронтендом целиком.
+
+Снимок - готовый JSON и его сжатые версии в SNAPSHOT_ROOT, общем для
+всех воркеров. Версия - хеш содержимого, поэтому версионированный адрес
+кэшируется навсегда. Изменение ингредиента сбрасывает указатель на
+текущую версию (api.signals), и следующий запрос собирает новую.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from recipes.models import Ingredient
+from .compression import compress_all
+from .renderers import FastJSONRenderer
+from .representations import INGREDIENT_FIELDS
+
+CURRENT_FILE = 'ingredients.current'
+IDENTITY = 'identity'
+
+# Версия неизменна, поэтому тела можно хранить в памяти процесса
+_bodies = {}
+MAX_CACHED_VERSIONS = 4
+
+
+def _root():
+    return Path(settings.SNAPSHOT_ROOT)
+
+
+def _path(version, encoding):
+    return _root() / f'ingredients.{version}.{encoding}'
+
+
+def _write(path, data):
+    """Атомарная запись: другие воркеры не увидят файл наполовину."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+    with os.fdopen(fd, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+def build():
+    """Собирает снимок из основной БД и делает его текущим."""
+    # Не с реплики: отставшая копия закрепилась бы до следующего изменения
+    rows = Ingredient.objects.using(DEFAULT_DB_ALIAS).values(
+        *INGREDIENT_FIELDS
+    )
+    body = FastJSONRenderer().render(list(rows))
+    version = hashlib.sha256(body).hexdigest()[:16]
+    bodies = {IDENTITY: body, **compress_all(body)}
+
+    root = _root()
+    root.mkdir(parents=True, exist_ok=True)
+    previous = _read_current()
+    for encoding, data in bodies.items():
+        _write(_path(version, encoding), data)
+    _write(root / CURRENT_FILE, version.encode())
+    _bodies.clear()
+    _bodies[version] = bodies
+
+    # Предыдущая версия остаётся для клиентов, получивших её адрес
+    # перед пересборкой
+    keep = {version, previous}
+    for path in root.glob('ingredients.*.*'):
+        if path.name.split('.')[1] not in keep:
+            path.unlink(missing_ok=True)
+    return version
+
+
+def _read_current():
+    try:
+        return (_root() / CURRENT_FILE).read_text()
+    except FileNotFoundError:
+        return None
+
+
+def current_version():
+    return _read_current() or build()
+
+
+def invalidate():
+    (_root() / CURRENT_FILE).unlink(missing_ok=True)
+
+
+def get_bodies(version):
+    """Тела версии по кодировкам или None, если версии нет."""
+    if version not in _bodies:
+        bodies = {}
+        for path in _root().glob(f'ingredients.{version}.*'):
+            bodies[path.name.rsplit('.', 1)[1]] = path.read_bytes()
+        if IDENTITY not in bodies:
+            return None
+        if len(_bodies) >= MAX_CACHED_VERSIONS:
+            _bodies.clear()
+        _bodies[version] = bodies
+    return _bodies[version]
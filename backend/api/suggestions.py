@@ -0,0 +1,197 @@
+"""
+Рекомендации, на кого подписаться: авторы, на которых подписаны те,
+на кого подписан пользователь, с учётом общих избранных рецептов.
+
+Вес кандидата w для пользователя u - число путей u → v → w по подпискам,
+умноженное на 1 + число рецептов, которые оба добавили в избранное.
+Расчёт пакетный (build_follow_suggestions): подписки и избранное
+загружаются в CSR-массивы numpy, пользователи обходятся блоками, пары
+каждого блока не превышают BLOCK_PAIRS, поэтому память ограничена
+размером массивов. Первые FOLLOW_SUGGESTIONS_PER_USER кандидатов
+пользователя сохраняются в FollowSuggestion и читаются одним запросом.
+"""
+import itertools
+
+import numpy as np
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from constants import FOLLOW_SUGGESTIONS_PER_USER
+from recipes.models import Favorite
+from users.models import FollowSuggestion, Subscription, User
+
+BLOCK_PAIRS = 2_000_000
+# Рецепты, которые в избранном почти у всех, ничего не говорят о вкусах
+# и дают квадратичное число пар
+POPULAR_RECIPE_USERS = 1000
+CHUNK_SIZE = 10000
+BATCH_SIZE = 5000
+
+
+def _values(queryset, *fields):
+    """Столбцы fields из основной БД в массивах numpy."""
+    rows = (
+        queryset.using(DEFAULT_DB_ALIAS)
+        .order_by()
+        .values_list(*fields, flat=len(fields) == 1)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    if len(fields) == 1:
+        return np.fromiter(rows, dtype=np.int64)
+    flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64)
+    return tuple(flat[i::len(fields)] for i in range(len(fields)))
+
+
+def _positions(ids, values):
+    """Позиции values в отсортированном ids и маска найденных."""
+    positions = np.minimum(np.searchsorted(ids, values), len(ids) - 1)
+    return positions, ids[positions] == values
+
+
+class CSR:
+    """Строки разреженной матрицы смежности: indptr и indices."""
+
+    def __init__(self, rows, columns, size):
+        order = np.argsort(rows, kind='stable')
+        self.indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=size), out=self.indptr[1:])
+        self.indices = columns[order].astype(np.int32)
+        self.degrees = np.diff(self.indptr)
+
+    def rows(self, start, stop):
+        """Пары (строка, столбец) строк start..stop-1."""
+        owners = np.repeat(np.arange(start, stop, dtype=np.int64),
+                           self.degrees[start:stop])
+        return owners, self.indices[self.indptr[start]:self.indptr[stop]]
+
+    def expand(self, owners, rows):
+        """Для каждой пары (owner, row) - все (owner, столбец строки row)."""
+        counts = self.degrees[rows]
+        starts = np.repeat(self.indptr[rows] - np.cumsum(counts) + counts,
+                           counts)
+        offsets = starts + np.arange(counts.sum())
+        return np.repeat(owners, counts), self.indices[offsets]
+
+
+def _two_hop_counts(first, second, start, stop, size):
+    """
+    Число путей u → x → w для u из start..stop-1 через матрицы first и
+    second: ключи u * size + w и счётчики.
+    """
+    owners, middle = first.rows(start, stop)
+    owners, targets = second.expand(owners, middle)
+    return np.unique(owners * size + targets, return_counts=True)
+
+
+class Graph:
+    """Подписки и избранное пользователей в CSR-массивах."""
+
+    def __init__(self, user_ids, subscriptions, favorites):
+        """
+        user_ids - отсортированные id пользователей, subscriptions - пары
+        (подписчик, автор), favorites - пары (пользователь, рецепт).
+        """
+        self.user_ids = user_ids
+        size = self.size = len(user_ids)
+
+        followers, authors = self._users(*subscriptions)
+        self.follows = CSR(followers, authors, size)
+
+        users, recipes = favorites
+        users, found = _positions(user_ids, users)
+        users = users[found]
+        # Номера рецептов подряд, чтобы строки CSR не зависели от их id
+        recipes = np.unique(recipes[found], return_inverse=True)[1]
+        popular = np.bincount(recipes) > POPULAR_RECIPE_USERS
+        keep = ~popular[recipes]
+        users, recipes = users[keep], recipes[keep]
+        self.favorites = CSR(users, recipes, size)
+        self.favorited_by = CSR(recipes, users, len(popular))
+
+        # Сколько пар даст каждый пользователь: по ней режутся блоки
+        self.cost = (
+            np.bincount(followers, weights=self.follows.degrees[authors],
+                        minlength=size)
+            + np.bincount(users,
+                          weights=self.favorited_by.degrees[recipes],
+                          minlength=size)
+        )
+
+    @classmethod
+    def from_db(cls):
+        return cls(
+            np.sort(_values(User.objects, 'id')),
+            _values(Subscription.objects, 'user_id', 'subscribed_to_id'),
+            _values(Favorite.objects, 'user_id', 'recipe_id'),
+        )
+
+    def _users(self, *columns):
+        """id пользователей -> позиции; связи с удалёнными отбрасываются."""
+        positions, found = zip(
+            *(_positions(self.user_ids, column) for column in columns)
+        )
+        found = np.logical_and.reduce(found)
+        return tuple(column[found] for column in positions)
+
+    def blocks(self):
+        """Границы блоков пользователей не больше BLOCK_PAIRS пар."""
+        start = 0
+        total = np.cumsum(self.cost)
+        while start < self.size:
+            done = total[start - 1] if start else 0
+            stop = np.searchsorted(total, done + BLOCK_PAIRS, side='right')
+            stop = min(max(stop, start + 1), self.size)
+            yield start, stop
+            start = stop
+
+    def suggestions(self, start, stop, limit):
+        """Лучшие limit кандидатов пользователей start..stop-1."""
+        size = self.size
+        keys, paths = _two_hop_counts(self.follows, self.follows,
+                                      start, stop, size)
+        owners, authors = self.follows.rows(start, stop)
+        users = np.arange(start, stop, dtype=np.int64)
+        known = np.concatenate([owners * size + authors, users * size + users])
+        keep = ~np.isin(keys, known)
+        keys, paths = keys[keep], paths[keep]
+
+        shared_keys, shared = _two_hop_counts(
+            self.favorites, self.favorited_by, start, stop, size
+        )
+        scores = paths.astype(np.float64)
+        if len(shared_keys):
+            positions, found = _positions(shared_keys, keys)
+            scores *= 1 + np.where(found, shared[positions], 0)
+
+        users, authors = np.divmod(keys, size)
+        order = np.lexsort((authors, -scores, users))
+        users, authors, scores = users[order], authors[order], scores[order]
+        rank = np.arange(len(users)) - np.searchsorted(users, users)
+        top = rank < limit
+        return users[top], authors[top], scores[top]
+
+
+def build(limit=FOLLOW_SUGGESTIONS_PER_USER):
+    """Пересчитывает рекомендации всех пользователей, возвращает их число."""
+    graph = Graph.from_db()
+    created = 0
+    for start, stop in graph.blocks():
+        users, authors, scores = graph.suggestions(start, stop, limit)
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            FollowSuggestion.objects.filter(
+                user_id__gte=graph.user_ids[start],
+                user_id__lte=graph.user_ids[stop - 1]
+            ).delete()
+            FollowSuggestion.objects.bulk_create(
+                (
+                    FollowSuggestion(user_id=user, suggested_id=author,
+                                     score=score)
+                    for user, author, score in zip(
+                        graph.user_ids[users].tolist(),
+                        graph.user_ids[authors].tolist(),
+                        scores.tolist()
+                    )
+                ),
+                batch_size=BATCH_SIZE
+            )
+        created += len(users)
+    return created
@@ -0,0 +1,163 @@
+"""
+Дельта-синхронизация клиентов: GET /api/sync/?since=<токен>.
+
+Сигналы (api.signals) пишут каждое изменение рецептов, избранного,
+списка покупок и подписок в журнал sync.Change. Клиент без токена
+получает текущий токен и загружает списки обычными запросами, дальше
+запрашивает только изменения.
+
+Токен - «txid.id» последней отданной записи, где txid - id записавшей её
+транзакции PostgreSQL. Порядок id не совпадает с порядком фиксации:
+транзакция с меньшим id может зафиксироваться позже. Поэтому отдаются
+только записи транзакций младше xmin снимка БД - все они уже завершены,
+а новые записи получат txid не меньше xmin и окажутся после токена.
+Долгая открытая транзакция задерживает синхронизацию, но не теряет
+изменений.
+"""
+from django.db import connections
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from constants import SYNC_MAX_CHANGES
+from recipes.models import Favorite, Recipe
+from sync.models import Change
+from users.models import Subscription
+from .representations import recipe_columns, recipes_data
+
+# Ключ ответа для каждого вида изменений
+SECTIONS = {
+    Change.Kind.RECIPE: 'recipes',
+    Change.Kind.FAVORITE: 'favorites',
+    Change.Kind.SHOPPING_CART: 'shopping_cart',
+    Change.Kind.SUBSCRIPTION: 'subscriptions',
+}
+
+
+class SyncTokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Токен устарел, загрузите данные заново.'
+    default_code = 'sync_token_expired'
+
+
+def record(instance, deleted=False):
+    """Пишет изменение instance в журнал."""
+    if isinstance(instance, Recipe):
+        fields = {'kind': Change.Kind.RECIPE, 'object_id': instance.pk}
+    elif isinstance(instance, Subscription):
+        fields = {'kind': Change.Kind.SUBSCRIPTION,
+                  'object_id': instance.subscribed_to_id,
+                  'user_id': instance.user_id}
+    else:
+        kind = (Change.Kind.FAVORITE if isinstance(instance, Favorite)
+                else Change.Kind.SHOPPING_CART)
+        fields = {'kind': kind, 'object_id': instance.recipe_id,
+                  'user_id': instance.user_id}
+    Change.objects.create(deleted=deleted, **fields)
+
+
+def format_token(txid, change_id):
+    return f'{txid}.{change_id}'
+
+
+def parse_token(value):
+    """(txid, id) из токена или None, если токен некорректный."""
+    txid, _, change_id = value.partition('.')
+    if not (txid.isdigit() and change_id.isdigit()):
+        return None
+    return int(txid), int(change_id)
+
+
+def _watermark(using):
+    """
+    xmin текущего снимка: транзакции с меньшим id завершены. В других
+    БД - None, там записи не ограничиваются.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint'
+        )
+        return cursor.fetchone()[0]
+
+
+def _finished():
+    """Записи завершённых транзакций: позже перед ними ничего не появится."""
+    changes = Change.objects.all()
+    # Граница читается до записей и из той же БД, поэтому все транзакции
+    # младше неё запрос записей уже видит
+    watermark = _watermark(changes.db)
+    if watermark is not None:
+        changes = changes.filter(txid__lt=watermark)
+    return changes
+
+
+def current_token():
+    last = _finished().order_by('-txid', '-id').values_list(
+        'txid', 'id'
+    ).first()
+    return format_token(*(last or (0, 0)))
+
+
+def changes_since(since, request):
+    """
+    Ответ /api/sync/: изменения после токена since (txid, id), видимые
+    автору запроса.
+
+    Несколько изменений одного объекта схлопываются в последнее.
+    Рецепты отдаются целиком в формате ленты, остальное - списками id.
+    """
+    txid, change_id = since
+    finished = _finished()
+    oldest = finished.order_by('id').values_list('id', flat=True).first()
+    # Запись токена удалена вместе со старой частью журнала (prune_changes
+    # удаляет записи по времени, и их id растут вместе с ним)
+    if oldest is not None and change_id < oldest - 1:
+        raise SyncTokenExpired
+
+    visible = Q(user__isnull=True)
+    if request.user.is_authenticated:
+        visible |= Q(user=request.user)
+    rows = list(
+        finished
+        .filter(visible, Q(txid__gt=txid) | Q(txid=txid, id__gt=change_id))
+        .order_by('txid', 'id')
+        .values_list('txid', 'id', 'kind', 'object_id', 'deleted')
+        [:SYNC_MAX_CHANGES + 1]
+    )
+    has_more = len(rows) > SYNC_MAX_CHANGES
+    rows = rows[:SYNC_MAX_CHANGES]
+
+    latest = {}
+    for _, _, kind, object_id, deleted in rows:
+        latest[kind, object_id] = deleted
+    sections = {section: {'changed': [], 'deleted': []}
+                for section in SECTIONS.values()}
+    for (kind, object_id), deleted in latest.items():
+        sections[SECTIONS[kind]]['deleted' if deleted else 'changed'].append(
+            object_id
+        )
+
+    recipes = sections['recipes']
+    found = {
+        row['id']: row
+        for row in Recipe.objects.filter(
+            id__in=recipes['changed']
+        ).values(*recipe_columns(request))
+    }
+    # Рецепт удалён после последней записи окна: удаление придёт позже,
+    # но отдавать его уже нечего
+    recipes['deleted'] += [recipe_id for recipe_id in recipes['changed']
+                           if recipe_id not in found]
+    recipes['changed'] = recipes_data(
+        [found[recipe_id] for recipe_id in recipes['changed']
+         if recipe_id in found],
+        request
+    )
+    return {
+        'token': format_token(*(rows[-1][:2] if rows else since)),
+        'has_more': has_more,
+        **sections,
+    }
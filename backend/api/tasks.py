@@ -0,0 +1,71 @@
+"""Фоновые задачи API (см. background.queue)."""
+import os
+import tempfile
+
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from background.queue import task
+from constants import RECIPE_IMAGE_MAX_SIDE
+from recipes.models import Recipe
+from users.models import User
+from . import similarity
+
+
+@task(batch=True)
+def delete_files(payloads):
+    """
+    Удаляет файлы из хранилища пачкой.
+
+    Файлы, на которые ещё ссылаются рецепты или аватары, остаются:
+    одна картинка может принадлежать нескольким записям.
+    """
+    names = {payload['name'] for payload in payloads if payload['name']}
+    used = set(
+        Recipe.objects.filter(image__in=names).values_list('image', flat=True)
+    ) | set(
+        User.objects.filter(avatar__in=names).values_list('avatar', flat=True)
+    )
+    for name in names - used:
+        default_storage.delete(name)
+
+
+@task()
+def shrink_image(name):
+    """
+    Уменьшает картинку до RECIPE_IMAGE_MAX_SIDE по большей стороне.
+
+    Файл перезаписывается на месте, поэтому адрес не меняется. Повторный
+    запуск ничего не делает: картинка уже нужного размера.
+    """
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        return
+    try:
+        image = Image.open(path)
+    except FileNotFoundError:
+        return
+    with image:
+        if max(image.size) <= RECIPE_IMAGE_MAX_SIDE:
+            return
+        image_format = image.format
+        image.thumbnail((RECIPE_IMAGE_MAX_SIDE, RECIPE_IMAGE_MAX_SIDE))
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as file:
+            image.save(file, format=image_format, optimize=True, quality=85)
+    os.replace(tmp_path, path)
+
+
+@task(batch=True)
+def update_similarity_index(payloads):
+    """Переносит изменённые и удалённые рецепты в дельту индекса похожих."""
+    similarity.update([payload['recipe_id'] for payload in payloads])
+
+
+@task()
+def delete_account(user_id):
+    """Удаляет аккаунт пачками (api.deletion)."""
+    # api.deletion ставит задачи этого модуля
+    from .deletion import delete_account
+    delete_account(user_id)
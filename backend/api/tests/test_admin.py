@@ -0,0 +1,88 @@
+from django.contrib import admin
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from background.models import Task
+from recipes.models import (Favorite, Ingredient, IngredientRecipe,
+                            ShoppingCart)
+from users.models import FollowSuggestion, Subscription, User
+from .utils import create_recipe, create_user
+
+# Число SQL-запросов списка админки не должно зависеть от числа строк
+MAX_QUERIES = 10
+
+
+class AdminQueryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password=None
+        )
+
+    def setUp(self):
+        self.client.force_login(self.superuser)
+
+    def _add_rows(self, number):
+        """По строке во всех моделях админки."""
+        author = create_user(f'author{number}')
+        reader = create_user(f'reader{number}')
+        recipe = create_recipe(author)
+        ingredient = Ingredient.objects.create(
+            name=f'Ингредиент {number}', measurement_unit='г'
+        )
+        IngredientRecipe.objects.create(recipe=recipe, ingredient=ingredient,
+                                        amount=10)
+        Favorite.objects.create(user=reader, recipe=recipe)
+        ShoppingCart.objects.create(user=reader, recipe=recipe)
+        Subscription.objects.create(user=reader, subscribed_to=author)
+        FollowSuggestion.objects.create(user=reader, suggested=author,
+                                        score=1)
+        Task.objects.create(name='test', key=f'test:{number}')
+        return recipe
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(captured)
+
+    def test_changelists_do_not_grow_with_rows(self):
+        self._add_rows(0)
+        urls = [
+            reverse(f'admin:{model._meta.app_label}_'
+                    f'{model._meta.model_name}_changelist')
+            for model in admin.site._registry
+        ]
+        # Первый запрос заполняет кэши типов содержимого и прав
+        for url in urls:
+            self._queries(url)
+        queries = {url: self._queries(url) for url in urls}
+
+        for number in range(1, 6):
+            self._add_rows(number)
+        for url, count in queries.items():
+            with self.subTest(url=url):
+                self.assertLessEqual(count, MAX_QUERIES)
+                with self.assertNumQueries(count):
+                    self.client.get(url)
+
+    def test_recipe_form(self):
+        recipe = self._add_rows(0)
+        url = reverse('admin:recipes_recipe_change', args=[recipe.pk])
+        self._queries(url)
+        count = self._queries(url)
+        self.assertLessEqual(count, MAX_QUERIES + 1)
+
+        for number in range(1, 3):
+            IngredientRecipe.objects.create(
+                recipe=recipe, amount=10,
+                ingredient=Ingredient.objects.create(
+                    name=f'Добавка {number}', measurement_unit='г'
+                )
+            )
+        # Виджет автодополнения читает выбранный ингредиент строки
+        with self.assertNumQueries(count + 2):
+            self.client.get(url)
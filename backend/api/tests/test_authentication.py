@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import CachedTokenAuthentication, token_cache_key
+from .utils import create_user
+
+
+@override_settings(SHARED_CACHE=True)
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('reader')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_cache_has_no_password(self):
+        self.auth.authenticate_credentials(self.token.key)
+        entry = cache.get(token_cache_key(self.token.key))
+        self.assertEqual(entry['id'], self.user.pk)
+        self.assertNotIn('password', entry['fields'])
+        self.assertNotIn(self.user.password, repr(entry))
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.username, self.user.username)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_logout_during_lookup_does_not_resurrect_token(self):
+        """Запрос прочитал токен до выхода и пишет в кэш после сброса."""
+        lookup = TokenAuthentication.authenticate_credentials
+
+        def lookup_then_logout(auth, key):
+            result = lookup(auth, key)
+            with self.captureOnCommitCallbacks(execute=True):
+                Token.objects.filter(key=key).delete()
+            return result
+
+        with mock.patch.object(TokenAuthentication, 'authenticate_credentials',
+                               autospec=True, side_effect=lookup_then_logout):
+            self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_user_change_resets_cache(self):
+        self.auth.authenticate_credentials(self.token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+
+@override_settings(SHARED_CACHE=False)
+class LocalCacheTokenAuthenticationTests(TestCase):
+    """Кэш процесса: выход в другом воркере сразу закрывает токен."""
+
+    def test_token_is_checked_in_database(self):
+        token = Token.objects.create(user=create_user('reader'))
+        auth = CachedTokenAuthentication()
+        auth.authenticate_credentials(token.key)
+        self.assertFalse(cache.has_key(token_cache_key(token.key)))
+
+        # Сброс кэша после фиксации в тесте не выполняется, как и
+        # в другом воркере
+        token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            auth.authenticate_credentials(token.key)
@@ -0,0 +1,141 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api import caching
+from api.representations import cached_recipe, recipe_cache_key
+from constants import LOCAL_CACHE_SECONDS
+from .utils import concurrently, create_recipe, create_user
+
+KEY = 'test:caching'
+VALUE = 'new'
+STALE_VALUE = 'old'
+THREADS = 20
+COMPUTE_SECONDS = 0.1
+
+
+class Compute:
+    """Медленное вычисление, считающее свои вызовы."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(COMPUTE_SECONDS)
+        if self.error is not None:
+            raise self.error
+        return VALUE
+
+
+class StampedeTests(TransactionTestCase):
+    """Потоки одновременно читают один ключ: значение вычисляется раз."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _herd(self, call):
+        return concurrently(THREADS, lambda index: call())
+
+    def _assert_herd(self, expires_in, values):
+        if expires_in is not None:
+            cache.set(KEY, (STALE_VALUE, time.time() + expires_in,
+                            COMPUTE_SECONDS), 60)
+        compute = Compute()
+        results = self._herd(lambda: caching.get_or_compute(KEY, compute, 60))
+        self.assertEqual(compute.calls, 1)
+        self.assertLessEqual(set(results), values)
+
+    def test_cold_key(self):
+        self._assert_herd(None, {VALUE})
+
+    def test_stale_key(self):
+        self._assert_herd(-1, {VALUE, STALE_VALUE})
+
+    def test_near_expiry_key(self):
+        # Часть потоков решает обновить значение заранее
+        self._assert_herd(COMPUTE_SECONDS, {VALUE, STALE_VALUE})
+
+    def test_processes(self):
+        """Каждый поток как отдельный процесс: только блокировка в кэше."""
+        compute = Compute()
+        results = self._herd(lambda: caching._load(KEY, compute, 60, 60))
+        self.assertEqual(compute.calls, 1)
+        self.assertEqual(set(results), {VALUE})
+
+    def test_recipe(self):
+        recipe = create_recipe(create_user('author'))
+        caching.invalidate(recipe_cache_key(recipe.pk))
+
+        def read():
+            with CaptureQueriesContext(connection) as captured:
+                cached_recipe(recipe.pk)
+            return len(captured)
+
+        # Строка рецепта и его ингредиенты
+        self.assertEqual(sum(self._herd(read)), 2)
+
+
+class CachingTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stale_value_on_error(self):
+        cache.set(KEY, (STALE_VALUE, time.time() - 1, COMPUTE_SECONDS), 60)
+        compute = Compute(error=ValueError('БД недоступна'))
+        with self.assertLogs('api.caching', 'ERROR'):
+            value = caching.get_or_compute(KEY, compute, 60)
+        self.assertEqual(value, STALE_VALUE)
+        self.assertIsNone(cache.get(caching._lock_key(KEY)))
+
+    def test_foreign_lock_is_kept(self):
+        token = caching._acquire(KEY)
+        self.assertIsNone(caching._acquire(KEY))
+        # Блокировка истекла, и её взял другой процесс
+        cache.set(caching._lock_key(KEY), 'other')
+        caching._release(KEY, token)
+        self.assertEqual(cache.get(caching._lock_key(KEY)), 'other')
+
+    def _expires(self, timeout):
+        caching.get_or_compute(KEY, lambda: VALUE, timeout)
+        return cache.get(KEY)[1] - time.time()
+
+    @override_settings(SHARED_CACHE=False)
+    def test_local_cache_keeps_values_briefly(self):
+        """Сброс в другом воркере сюда не дойдёт."""
+        self.assertLessEqual(self._expires(3600), LOCAL_CACHE_SECONDS)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_shared_cache_keeps_timeout(self):
+        self.assertGreater(self._expires(3600), 3500)
+
+    @mock.patch('api.caching.CACHE_LOCK_SECONDS', COMPUTE_SECONDS)
+    def test_waiter_does_not_wait_for_hung_leader(self):
+        started, release = threading.Event(), threading.Event()
+
+        def hang():
+            started.set()
+            release.wait(10)
+            return STALE_VALUE
+
+        leader = threading.Thread(
+            target=caching.get_or_compute, args=(KEY, hang, 60)
+        )
+        leader.start()
+        try:
+            started.wait(10)
+            compute = Compute()
+            self.assertEqual(caching.get_or_compute(KEY, compute, 60), VALUE)
+            self.assertEqual(compute.calls, 1)
+        finally:
+            release.set()
+            leader.join()
@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from api import deletion
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart)
+from sync.models import Change
+from users.models import FollowSuggestion, Subscription, User
+from .utils import create_recipe, create_user
+
+RECIPES = 5
+
+
+@mock.patch('api.deletion.CHUNK_SIZE', 2)
+class DeleteAccountTests(TestCase):
+    """Рецепты автора занимают несколько пачек."""
+
+    def setUp(self):
+        self.author = create_user('author')
+        self.fan = create_user('fan')
+        ingredient = Ingredient.objects.create(name='Соль',
+                                               measurement_unit='г')
+        for number in range(RECIPES):
+            recipe = create_recipe(self.author, name=f'Рецепт {number}')
+            IngredientRecipe.objects.create(recipe=recipe,
+                                            ingredient=ingredient, amount=1)
+            Favorite.objects.create(user=self.fan, recipe=recipe)
+            ShoppingCart.objects.create(user=self.fan, recipe=recipe)
+        self.kept = create_recipe(self.fan, name='Свой')
+        Favorite.objects.create(user=self.author, recipe=self.kept)
+        Favorite.objects.create(user=self.fan, recipe=self.kept)
+        Subscription.objects.create(user=self.fan, subscribed_to=self.author)
+        Subscription.objects.create(user=self.author, subscribed_to=self.fan)
+        FollowSuggestion.objects.create(user=self.fan, suggested=self.author,
+                                        score=1)
+
+    def test_no_rows_left(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            deletion.delete_account(self.author.pk)
+
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(list(Recipe.objects.all()), [self.kept])
+        self.assertFalse(
+            IngredientRecipe.objects.exclude(recipe=self.kept).exists()
+        )
+        self.assertEqual(
+            list(Favorite.objects.values_list('user_id', 'recipe_id')),
+            [(self.fan.pk, self.kept.pk)]
+        )
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertFalse(Subscription.objects.exists())
+        self.assertFalse(FollowSuggestion.objects.exists())
+        self.assertEqual(
+            Change.objects.filter(kind=Change.Kind.RECIPE,
+                                  deleted=True).count(),
+            RECIPES
+        )
+
+        # Повторный вызов для удалённого пользователя ничего не делает
+        deletion.delete_account(self.author.pk)
+        self.assertTrue(Recipe.objects.filter(pk=self.kept.pk).exists())
@@ -0,0 +1,101 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from api import events
+from .utils import create_recipe, create_user
+
+STREAM_URL = '/api/recipes/stream/'
+TICKET_URL = '/api/recipes/stream/ticket/'
+
+
+class StreamTicketTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('reader')
+
+    def test_ticket_requires_authentication(self):
+        self.assertEqual(APIClient().post(TICKET_URL).status_code, 401)
+
+    def test_ticket(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        ticket = client.post(TICKET_URL).json()['ticket']
+        user_id = async_to_sync(events.aticket_user_id)
+        self.assertIsNone(user_id(ticket + 'x'))
+        with mock.patch('api.events.STREAM_TICKET_SECONDS', -1):
+            self.assertIsNone(user_id(ticket))
+        self.assertEqual(user_id(ticket), self.user.pk)
+        # Билет из журнала доступа повторно не подходит
+        self.assertIsNone(user_id(ticket))
+
+
+class StreamTests(TransactionTestCase):
+    """Поток закрывает соединения с БД, поэтому без транзакции теста."""
+
+    def setUp(self):
+        self.user = create_user('reader')
+
+    async def _open(self, ticket):
+        return await AsyncClient().get(STREAM_URL, {'ticket': ticket})
+
+    async def test_stream_with_ticket(self):
+        """EventSource открывает поток без заголовка Authorization."""
+        response = await self._open(events.issue_ticket(self.user.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = aiter(response.streaming_content)
+        self.assertTrue((await anext(content)).startswith(b'retry:'))
+        await content.aclose()
+
+    async def test_stream_with_bad_ticket(self):
+        response = await self._open('bad')
+        self.assertEqual(response.status_code, 401)
+
+        ticket = events.issue_ticket(self.user.pk)
+        response = await self._open(ticket)
+        await response.streaming_content.aclose()
+        response = await self._open(ticket)
+        self.assertEqual(response.status_code, 401)
+
+        self.user.is_active = False
+        await self.user.asave()
+        response = await self._open(events.issue_ticket(self.user.pk))
+        self.assertEqual(response.status_code, 401)
+
+
+class PublishTests(TestCase):
+
+    def test_created_recipe_is_published_on_commit(self):
+        """Событие и для рецептов, созданных не через API."""
+        with mock.patch('api.events.publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe = create_recipe(create_user('author'))
+                publish.assert_not_called()
+            publish.assert_called_once_with(recipe)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe.save()
+            publish.assert_called_once()
+
+
+class ListenTests(TestCase):
+
+    async def test_listen_uses_database_options(self):
+        """sslmode и другие OPTIONS доходят до соединения LISTEN."""
+        options = {'sslmode': 'prefer'}
+        with mock.patch.dict(
+            connections[DEFAULT_DB_ALIAS].settings_dict['OPTIONS'], options
+        ), mock.patch('psycopg.AsyncConnection.connect',
+                      side_effect=RuntimeError) as connect:
+            with self.assertRaises(RuntimeError):
+                await events.Hub()._listen()
+        params = connect.call_args.kwargs
+        self.assertEqual(params['sslmode'], 'prefer')
+        self.assertTrue(params['autocommit'])
+        self.assertNotIn('cursor_factory', params)
@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.test import TestCase
+from prometheus_client.parser import text_string_to_metric_families
+from rest_framework.test import APIClient
+
+from api import metrics
+from users.models import User
+from .utils import create_recipe, create_user
+
+RECORD = '''
+from api import metrics
+request_metrics = metrics.RequestMetrics()
+request_metrics.queries = 3
+metrics.record('GET', 'recipe-list', request_metrics, 0.5)
+'''
+EXPOSE = '''
+import sys
+from django.conf import settings
+settings.configure()
+from api import metrics
+sys.stdout.write(metrics.metrics_view(None).content.decode())
+'''
+
+
+def parse(text):
+    """Значения /metrics: {(имя, method, view): значение}."""
+    return {
+        (sample.name, sample.labels.get('method'), sample.labels.get('view')):
+            sample.value
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+    }
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        create_recipe(create_user('author'))
+
+    def _metrics(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        return parse(response.content.decode())
+
+    def test_request_is_counted(self):
+        before = self._metrics()
+        response = self.client.get('/api/recipes/')
+        after = self._metrics()
+
+        queries = int(response['Server-Timing'].split('desc="')[1].split()[0])
+        self.assertGreater(queries, 0)
+        for name, delta in (('foodgram_requests_total', 1),
+                            ('foodgram_db_queries_total', queries)):
+            key = (name, 'GET', 'recipe-list')
+            self.assertEqual(after[key] - before.get(key, 0), delta)
+        key = ('foodgram_request_duration_seconds_total', 'GET', 'recipe-list')
+        self.assertGreater(after[key], before.get(key, 0))
+
+    def test_savepoints_are_not_counted(self):
+        request_metrics, token = metrics.start_request()
+        try:
+            # Внутри транзакции теста atomic() создаёт точку сохранения
+            with transaction.atomic():
+                User.objects.count()
+        finally:
+            metrics.finish_request(token)
+        self.assertEqual(request_metrics.queries, 1)
+
+
+class MultiprocessMetricsTests(TestCase):
+    """Под gunicorn /metrics суммирует счётчики всех воркеров."""
+
+    def _run(self, code, directory):
+        env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory}
+        env.pop('DJANGO_SETTINGS_MODULE', None)
+        return subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout
+
+    def test_workers_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for _ in range(2):
+                self._run(RECORD, directory)
+            values = parse(self._run(EXPOSE, directory))
+        labels = ('GET', 'recipe-list')
+        self.assertEqual(values['foodgram_requests_total', *labels], 2)
+        self.assertEqual(values['foodgram_db_queries_total', *labels], 6)
+        self.assertEqual(
+            values['foodgram_request_duration_seconds_total', *labels], 1
+        )
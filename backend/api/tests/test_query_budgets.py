@@ -0,0 +1,86 @@
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.middleware import QueryBudgetExceeded
+from recipes.models import Favorite, Ingredient, IngredientRecipe, ShoppingCart
+from users.models import FollowSuggestion, Subscription
+from .utils import create_recipe, create_user
+
+RECIPES = 5
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """Превышение бюджета из QUERY_BUDGETS роняет тест."""
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(INDEX_ROOT=directory.name,
+                                     SNAPSHOT_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.reader = create_user('reader')
+        authors = [create_user(f'author{number}') for number in range(2)]
+        self.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(3)
+        ]
+        self.recipes = []
+        for number in range(RECIPES):
+            recipe = create_recipe(authors[number % 2],
+                                   name=f'Рецепт {number}')
+            for ingredient in self.ingredients:
+                IngredientRecipe.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                )
+            Favorite.objects.create(user=self.reader, recipe=recipe)
+            ShoppingCart.objects.create(user=self.reader, recipe=recipe)
+            self.recipes.append(recipe)
+        for author in authors:
+            Subscription.objects.create(user=self.reader,
+                                        subscribed_to=author)
+            FollowSuggestion.objects.create(
+                user=self.reader, suggested=create_user(f'{author}x'),
+                score=1
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_budgeted_endpoints(self):
+        recipe = self.recipes[0]
+        ids = ','.join(str(recipe.pk) for recipe in self.recipes)
+        requests = [
+            ('/api/recipes/', {}),
+            ('/api/recipes/', {'is_favorited': 1}),
+            ('/api/recipes/', {'ids': ids}),
+            (f'/api/recipes/{recipe.pk}/', {}),
+            ('/api/ingredients/', {'name': 'Ингр'}),
+            ('/api/users/subscriptions/', {}),
+            ('/api/users/suggestions/', {}),
+            ('/api/sync/', {}),
+            (f'/api/recipes/{recipe.pk}/similar/', {}),
+            ('/api/recipes/pantry/', {'ingredients': self.ingredients[0].pk}),
+        ]
+        for url, params in requests:
+            with self.subTest(url=url, params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200, response.content)
+
+        response = self.client.post(
+            '/api/recipes/batch/',
+            {'ids': [recipe.pk for recipe in self.recipes]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(response.json()), RECIPES)
+
+    @override_settings(QUERY_BUDGETS={'GET recipe-list': 1})
+    def test_exceeded_budget_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get('/api/recipes/')
@@ -0,0 +1,33 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .utils import create_recipe, create_user
+
+
+class RecipeIdsTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        author = create_user('author')
+        self.first = create_recipe(author, name='Первый')
+        self.second = create_recipe(author, name='Второй')
+
+    def test_ids_in_request_order(self):
+        response = self.client.get(
+            '/api/recipes/', {'ids': f'{self.second.pk},{self.first.pk}',
+                              'fields': 'id,name'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {'id': self.second.pk, 'name': 'Второй'},
+            {'id': self.first.pk, 'name': 'Первый'},
+        ])
+
+    def test_ids_with_filters_are_rejected(self):
+        for params in ({'is_favorited': 1}, {'author': 1}, {'tags': 'x'},
+                       {'page': 2}):
+            response = self.client.get(
+                '/api/recipes/', {'ids': self.first.pk, **params}
+            )
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('ids', response.json())
@@ -0,0 +1,58 @@
+from django.test import TransactionTestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+from .utils import concurrently, create_recipe, create_user
+
+THREADS = 8
+
+
+class ConcurrentRelationTests(TransactionTestCase):
+    """
+    Одновременные одинаковые POST избранного, списка покупок и подписки:
+    одна строка, один ответ 201, остальные - 400 с прежним текстом ошибки.
+    """
+
+    def setUp(self):
+        self.user = create_user('reader')
+        self.author = create_user('author')
+        self.recipe = create_recipe(self.author, name='Борщ')
+
+    def _post(self, url):
+        def post(index):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            response = client.post(url)
+            return response.status_code, response.json()
+        return concurrently(THREADS, post)
+
+    def _assert_single(self, responses, model, error):
+        statuses = sorted(status_code for status_code, _ in responses)
+        self.assertEqual(
+            statuses,
+            [status.HTTP_201_CREATED]
+            + [status.HTTP_400_BAD_REQUEST] * (THREADS - 1)
+        )
+        for status_code, body in responses:
+            if status_code == status.HTTP_400_BAD_REQUEST:
+                self.assertEqual(body, {'non_field_errors': [error]})
+        self.assertEqual(model.objects.count(), 1)
+
+    def test_favorite(self):
+        responses = self._post(f'/api/recipes/{self.recipe.pk}/favorite/')
+        self._assert_single(responses, Favorite,
+                            'Рецепт "Борщ" уже добавлен.')
+
+    def test_shopping_cart(self):
+        responses = self._post(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/'
+        )
+        self._assert_single(responses, ShoppingCart,
+                            'Рецепт - Борщ уже добавлен!')
+
+    def test_subscribe(self):
+        responses = self._post(f'/api/users/{self.author.pk}/subscribe/')
+        self._assert_single(responses, Subscription,
+                            'Вы уже подписаны на author!')
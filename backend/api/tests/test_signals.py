@@ -0,0 +1,32 @@
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from api import caching, snapshots
+from recipes.models import Ingredient
+
+
+class IngredientChangedTests(TestCase):
+    """Кэши справочника сбрасываются только после фиксации транзакции."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(SNAPSHOT_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_snapshot_is_invalidated_on_commit(self):
+        version = snapshots.current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Соль', measurement_unit='г')
+            # До фиксации указатель на снимок прежний
+            self.assertEqual(snapshots.current_version(), version)
+        self.assertNotEqual(snapshots.current_version(), version)
+
+    def test_generation_is_bumped_on_commit(self):
+        generation = caching.generation('ingredients')
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Перец', measurement_unit='г')
+            self.assertEqual(caching.generation('ingredients'), generation)
+        self.assertNotEqual(caching.generation('ingredients'), generation)
@@ -0,0 +1,34 @@
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from api import similarity
+
+
+class GenerationTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(INDEX_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def _publish(self, recipe_id):
+        with similarity._lock():
+            return similarity._publish(similarity.base_arrays(
+                np.array([recipe_id]), np.array([1])
+            ))
+
+    def test_removed_generation_reloads_current(self):
+        """Воркер прочитал указатель, а поколение успели удалить."""
+        stale = self._publish(1)
+        self._publish(2)
+        current = self._publish(3)
+        self.assertFalse((similarity._root() / stale).exists())
+
+        generation, index = similarity._load(stale)
+
+        self.assertEqual(generation, current)
+        self.assertEqual(index.ids.tolist(), [3])
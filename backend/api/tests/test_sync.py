@@ -0,0 +1,70 @@
+import threading
+
+from django.db import connections, transaction
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from .utils import create_recipe, create_user
+
+
+class SyncTests(TransactionTestCase):
+    # Токен без записей - 0.0, журнал начинается с id 1
+    reset_sequences = True
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = create_user('author')
+
+    def _sync(self, token):
+        response = self.client.get('/api/sync/', {'since': token})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _changed(self, data):
+        return [recipe['id'] for recipe in data['recipes']['changed']]
+
+    def test_changes_after_token(self):
+        token = self.client.get('/api/sync/').json()['token']
+        recipe = create_recipe(self.author)
+
+        data = self._sync(token)
+        self.assertEqual(self._changed(data), [recipe.pk])
+        self.assertEqual(self._changed(self._sync(data['token'])), [])
+
+    def test_invalid_token(self):
+        for token in ('abc', '12', '1.x'):
+            response = self.client.get('/api/sync/', {'since': token})
+            self.assertEqual(response.status_code, 400)
+
+    def test_late_commit_is_not_lost(self):
+        """
+        Транзакция получила id записи журнала раньше, а зафиксировалась
+        позже следующей: её изменение приходит со следующим токеном.
+        """
+        token = self.client.get('/api/sync/').json()['token']
+        written, release = threading.Event(), threading.Event()
+        late = []
+
+        def write_late():
+            try:
+                with transaction.atomic():
+                    late.append(create_recipe(self.author, name='Поздний'))
+                    written.set()
+                    release.wait(10)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=write_late)
+        thread.start()
+        written.wait(10)
+        early = create_recipe(self.author, name='Ранний')
+
+        # Незавершённая транзакция задерживает и более поздние записи
+        data = self._sync(token)
+        self.assertEqual(self._changed(data), [])
+
+        release.set()
+        thread.join()
+        data = self._sync(data['token'])
+        self.assertEqual(sorted(self._changed(data)),
+                         sorted([late[0].pk, early.pk]))
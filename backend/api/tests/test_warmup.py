@@ -0,0 +1,26 @@
+import tempfile
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import SimpleTestCase, override_settings
+
+from api import warmup
+
+
+class WarmUpTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(SNAPSHOT_ROOT=directory.name,
+                                     INDEX_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    @mock.patch('api.snapshots.build',
+                side_effect=OperationalError('no such table'))
+    def test_unmigrated_database(self, build):
+        """До migrate мастер gunicorn запускается без прогрева данных."""
+        with self.assertLogs('api.warmup', 'ERROR'):
+            warmup.warm_up()
+        build.assert_called_once()
@@ -0,0 +1,51 @@
+import threading
+
+from django.db import connections
+
+from api.utils import get_short_link
+from recipes.models import Recipe
+from users.models import User
+
+
+def concurrently(count, call):
+    """
+    call(index) одновременно в count потоках, результаты по порядку.
+    У каждого потока своё соединение с БД, оно закрывается в конце.
+    """
+    barrier = threading.Barrier(count)
+    results = [None] * count
+    errors = []
+
+    def run(index):
+        try:
+            barrier.wait()
+            results[index] = call(index)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=run, args=(index,))
+               for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com',
+        password='password', first_name='Тест', last_name='Тест'
+    )
+
+
+def create_recipe(author, name='Рецепт', **fields):
+    return Recipe.objects.create(
+        author=author, name=name, text='Описание', cooking_time=10,
+        image='images/recipes/test.png', short_link=get_short_link(Recipe),
+        **fields
+    )
@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import СustomizeUserViewSet, RecipeViewSet, IngredientViewSet
+from . import async_views
+from .views import (СustomizeUserViewSet, RecipeViewSet, IngredientViewSet,
+                    JWTTokenCreateView, JWTTokenRefreshView,
+                    StreamTicketView, SyncView)
 
 
 router = DefaultRouter()
@@ -12,6 +16,37 @@ router.register('users', СustomizeUserViewSet)
 
 
 urlpatterns = [
+    # Перед роутером: иначе stream примется за pk рецепта
+    path('recipes/stream/', async_views.recipe_stream, name='recipe-stream'),
+    path('recipes/stream/ticket/', StreamTicketView.as_view(),
+         name='recipe-stream-ticket'),
+]
+
+if settings.ASYNC_VIEWS:
+    # Перед роутером, чтобы перехватить те же адреса
+    urlpatterns += [
+        path('recipes/', async_views.recipe_list, name='recipe-list'),
+        path('recipes/<int:pk>/', async_views.recipe_detail,
+             name='recipe-detail'),
+        path('recipes/download_shopping_cart/',
+             async_views.download_shopping_cart,
+             name='recipe-download-shopping-cart'),
+        path('ingredients/', async_views.ingredient_list,
+             name='ingredient-list'),
+    ]
+
+urlpatterns += [
+    path('sync/', SyncView.as_view(), name='sync'),
     path('', include(router.urls)),
+]
+
+if settings.AUTH_MODE == 'jwt':
+    urlpatterns += [
+        path('auth/token/login/', JWTTokenCreateView.as_view(), name='login'),
+        path('auth/token/refresh/', JWTTokenRefreshView.as_view(),
+             name='token_refresh'),
+    ]
+
+urlpatterns += [
     path('auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,9 +1,18 @@
+import hashlib
 import secrets
 import string
 
-from django.shortcuts import get_object_or_404, redirect
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.models import Sum
+from django.db.models.signals import post_save
+from django.http import Http404
+from django.shortcuts import redirect
 
-from recipes.models import Recipe
+from constants import (INGREDIENT_SEARCH_CACHE_SECONDS,
+                       SHORT_LINK_CACHE_SECONDS)
+from recipes.models import Ingredient, IngredientRecipe, Recipe
+from . import caching
+from .representations import INGREDIENT_FIELDS
 
 
 def get_short_link(model, length=6):
@@ -14,9 +23,115 @@ def get_short_link(model, length=6):
             return short_link
 
 
+def insert_or_none(model, **fields):
+    """
+    Вставляет строку одним запросом INSERT ... ON CONFLICT DO NOTHING.
+
+    Возвращает созданный объект или None, если такая запись уже есть.
+    В отличие от связки exists() + create() не даёт IntegrityError
+    при параллельных запросах.
+
+    Вставка идёт мимо Model.save(), поэтому сигналы отправляет сама
+    функция: после вставки - post_save с created=True, как save();
+    pre_save не отправляется, при конфликте сигналов нет. Вызывающей
+    стороне отправлять сигналы не нужно.
+    """
+    obj = model(**fields)
+    using = router.db_for_write(model)
+    connection = connections[using]
+    opts = model._meta
+    insert_fields = [
+        field for field in opts.concrete_fields
+        if field is not opts.pk
+    ]
+    values = [
+        field.get_db_prep_save(field.pre_save(obj, True), connection)
+        for field in insert_fields
+    ]
+    qn = connection.ops.quote_name
+    sql = (
+        f'INSERT INTO {qn(opts.db_table)} '
+        f'({", ".join(qn(field.column) for field in insert_fields)}) '
+        f'VALUES ({", ".join(["%s"] * len(values))}) '
+        f'ON CONFLICT DO NOTHING RETURNING {qn(opts.pk.column)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values)
+        row = cursor.fetchone()
+
+    if row is None:
+        return None
+    obj.pk = row[0]
+    obj._state.adding = False
+    obj._state.db = using
+    # Единственное место отправки сигнала (см. docstring): обработчики
+    # post_save (журнал синхронизации) не зависят от способа вставки
+    post_save.send(sender=model, instance=obj, created=True,
+                   update_fields=None, raw=False, using=using)
+    return obj
+
+
+def shopping_cart_ingredients(user):
+    """Суммарное количество ингредиентов из списка покупок пользователя."""
+    return (
+        IngredientRecipe.objects
+        .filter(recipe__recipe_shopping_carts__user=user)
+        .values('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(total_amount=Sum('amount'))
+        .order_by('ingredient__name')
+    )
+
+
+def shopping_cart_line(ingredient):
+    return (
+        f"{ingredient['ingredient__name']} "
+        f"({ingredient['ingredient__measurement_unit']}) - "
+        f"{ingredient['total_amount']}"
+    )
+
+
+def short_link_cache_key(short_link):
+    return f'short_link:{short_link}'
+
+
+def short_link_recipe_id(short_link):
+    """
+    id рецепта по короткой ссылке или None. Отсутствие тоже кэшируется:
+    перебор несуществующих ссылок не доходит до БД, а создание рецепта
+    сбрасывает ключ своей ссылки (api.signals).
+    """
+    return caching.get_or_compute(
+        short_link_cache_key(short_link),
+        lambda: Recipe.objects.using(DEFAULT_DB_ALIAS).filter(
+            short_link=short_link
+        ).values_list('id', flat=True).first(),
+        SHORT_LINK_CACHE_SECONDS
+    )
+
+
+def search_ingredients(terms):
+    """
+    Ингредиенты, названия которых начинаются со всех terms (как
+    SearchFilter с search_fields = ('^name',)). Изменение справочника
+    переводит кэш на новое поколение (api.signals).
+    """
+    digest = hashlib.sha1('\0'.join(terms).encode()).hexdigest()
+    key = f'ingredients:{caching.generation("ingredients")}:{digest}'
+
+    def compute():
+        queryset = Ingredient.objects.using(DEFAULT_DB_ALIAS)
+        for term in terms:
+            queryset = queryset.filter(name__istartswith=term)
+        return list(queryset.values(*INGREDIENT_FIELDS))
+
+    return caching.get_or_compute(key, compute,
+                                  INGREDIENT_SEARCH_CACHE_SECONDS)
+
+
 def recipe_absolute_uri(request, short_link):
-    recipe = get_object_or_404(Recipe, short_link=short_link)
-    recipe_id = recipe.id
+    recipe_id = short_link_recipe_id(short_link)
+    if recipe_id is None:
+        raise Http404
     return redirect(
         request.build_absolute_uri('/') + f'recipes/{recipe_id}/'
     )
\ No newline at end of file
@@ -1,21 +1,33 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.contrib.auth import user_logged_in
+from django.http import HttpResponse, HttpResponseNotModified
+from django.shortcuts import redirect
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
-from djoser.views import UserViewSet
+from djoser.views import TokenCreateView, UserViewSet
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.filters import SearchFilter
 from rest_framework.response import Response
 from rest_framework.permissions import (AllowAny, IsAuthenticatedOrReadOnly,
                                         IsAuthenticated)
+from rest_framework.views import APIView
 from rest_framework.viewsets import ReadOnlyModelViewSet
+from rest_framework_simplejwt.views import TokenRefreshView
 
-from recipes.models import (
-    Ingredient, IngredientRecipe, Recipe, Favorite, ShoppingCart
-)
+from background.queue import enqueue_on_commit
+from constants import (MAX_BATCH_RECIPES, MAX_INDEX_RECIPES,
+                       MAX_PANTRY_INGREDIENTS, PAGE_SIZE)
+from recipes.models import Ingredient, Recipe, Favorite, ShoppingCart
 from users.models import Subscription, User
+from . import deletion, events, similarity, snapshots, sync
+from .authentication import get_jwt_for_user
 from .filters import RecipeQueryFilter
 from .pagination import CustomPagePagination
+from .representations import (cached_recipe, recipe_columns, recipes_data,
+                              selected_fields, subscription_columns,
+                              subscriptions_data)
 from .permissions import IsOwnerOrReadOnly
 from .serializers import (UserDetailSerializer,
                           RecipeCreateViewSerializer,
@@ -25,9 +37,67 @@ from .serializers import (UserDetailSerializer,
                           ShoppingCartViewSerializer,
                           SubscriperViewSerializer,
                           SubscriptionUserSerializer,
-                          AvatarUserSerializer
+                          AvatarUserSerializer,
+                          JWTRefreshSerializer
                           )
-from .utils import get_short_link
+from .tasks import delete_account, delete_files, shrink_image
+from .utils import (get_short_link, search_ingredients,
+                    shopping_cart_ingredients, shopping_cart_line)
+
+
+def parse_ids(values, field, error):
+    """
+    id из строк вида '1,2,3' или чисел из JSON.
+    При ошибке - ValidationError с текстом error для поля field.
+    """
+    ids = []
+    try:
+        for value in values:
+            if isinstance(value, bool):
+                raise ValueError
+            if isinstance(value, int):
+                ids.append(value)
+            else:
+                ids.extend(int(item) for item in str(value).split(',')
+                           if item)
+    except (TypeError, ValueError):
+        raise ValidationError({field: [error]})
+    return ids
+
+
+def batch_recipe_ids(values):
+    """id рецептов пакетного запроса: без повторов, в порядке запроса."""
+    ids = list(dict.fromkeys(
+        parse_ids(values, 'ids', 'Ожидаются id рецептов через запятую.')
+    ))
+    if not ids:
+        raise ValidationError({'ids': ['Укажите id рецептов.']})
+    if len(ids) > MAX_BATCH_RECIPES:
+        raise ValidationError({'ids': [
+            f'Не больше {MAX_BATCH_RECIPES} рецептов за запрос.'
+        ]})
+    return ids
+
+
+def query_recipe_ids(request):
+    """
+    id рецептов из ?ids=. Фильтры и пагинация к пакетному запросу не
+    применяются, поэтому вместе с ?ids= допустимы только ?fields= и ?omit=.
+    """
+    extra = sorted(set(request.query_params) - {'ids', 'fields', 'omit'})
+    if extra:
+        raise ValidationError({'ids': [
+            f'Нельзя сочетать с параметрами: {", ".join(extra)}.'
+        ]})
+    return batch_recipe_ids(request.query_params.getlist('ids'))
+
+
+def uses_recipe_cache(request):
+    """
+    Рецепт берётся из кэша, если параметры запроса не фильтруют его
+    (?is_favorited= и др. применяются и к одному рецепту).
+    """
+    return set(request.query_params) <= {'fields', 'omit'}
 
 
 class СustomizeUserViewSet(UserViewSet):
@@ -55,6 +125,15 @@ class СustomizeUserViewSet(UserViewSet):
         return serializer_map.get(self.action,
                                   super().get_serializer_class())
 
+    def perform_destroy(self, instance):
+        """
+        Аккаунт сразу закрывается, а рецепты и связи удаляет воркер
+        (api.deletion): у активного автора их слишком много для запроса.
+        """
+        deletion.deactivate_account(instance)
+        enqueue_on_commit(delete_account, {'user_id': instance.pk},
+                          key=f'delete_account:{instance.pk}')
+
     @action(
         detail=False,
         methods=['get'],
@@ -91,11 +170,28 @@ class СustomizeUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         """Список подписок пользователя."""
-        page = self.paginate_queryset(self.get_queryset())
-        serializer = self.get_serializer(
-            page, many=True, context={'request': request}
+        page = self.paginate_queryset(
+            self.get_queryset().values(*subscription_columns(request))
         )
-        return self.get_paginated_response(serializer.data)
+        return self.get_paginated_response(subscriptions_data(page, request))
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated]
+    )
+    def suggestions(self, request):
+        """На кого подписаться: рассчитывается пакетно (api.suggestions)."""
+        queryset = (
+            User.objects
+            .filter(suggested_to__user=request.user)
+            .exclude(subscriptions__user=request.user)
+            .order_by('-suggested_to__score', 'id')
+        )
+        page = self.paginate_queryset(
+            queryset.values(*subscription_columns(request))
+        )
+        return self.get_paginated_response(subscriptions_data(page, request))
 
     @action(
         detail=True,
@@ -142,6 +238,59 @@ class RecipeViewSet(viewsets.ModelViewSet):
             author=self.request.user,
             short_link=get_short_link(Recipe)
         )
+        self._shrink_image(serializer.instance.image.name)
+
+    def perform_update(self, serializer):
+        old_image = serializer.instance.image.name
+        serializer.save()
+        if serializer.instance.image.name != old_image:
+            self._shrink_image(serializer.instance.image.name)
+            self._delete_image(old_image)
+
+    def perform_destroy(self, instance):
+        deletion.delete_recipes(Recipe.objects.filter(pk=instance.pk))
+
+    # Работа с файлами выполняется воркером после фиксации транзакции
+    def _shrink_image(self, name):
+        enqueue_on_commit(shrink_image, {'name': name},
+                          key=f'shrink_image:{name}')
+
+    def _delete_image(self, name):
+        enqueue_on_commit(delete_files, {'name': name},
+                          key=f'delete_files:{name}')
+
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            ids = query_recipe_ids(request)
+            return Response(
+                recipes_data(self._rows_in_order(ids, request), request)
+            )
+        queryset = self.filter_queryset(
+            self.get_queryset()
+        ).values(*recipe_columns(request))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(recipes_data(page, request))
+        return Response(recipes_data(queryset, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.kwargs[self.lookup_field]
+        if not uses_recipe_cache(request):
+            row = get_object_or_404(
+                self.filter_queryset(self.get_queryset()).values(
+                    *recipe_columns(request)
+                ),
+                pk=pk
+            )
+            return Response(recipes_data([row], request)[0])
+        shared = None
+        if pk.isdigit():
+            shared = cached_recipe(int(pk), request.user.pk)
+        if shared is None:
+            raise NotFound
+        return Response(recipes_data(
+            [shared['row']], request, {'ingredients': shared['ingredients']}
+        )[0])
 
     def get_serializer_class(self):
         action_serializers = {
@@ -170,6 +319,90 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def similar(self, request, **kwargs):
+        """Рецепты с самыми похожими наборами ингредиентов (api.similarity)."""
+        recipe_id = get_object_or_404(
+            self.get_queryset().values_list('id', flat=True),
+            pk=self.kwargs[self.lookup_field]
+        )
+        ids = similarity.similar_recipes(recipe_id, self._limit(request))
+        return Response(
+            recipes_data(self._rows_in_order(ids, request), request)
+        )
+
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def pantry(self, request):
+        """
+        Что приготовить из имеющихся продуктов.
+
+        ?ingredients=1,2,3 - id ингредиентов. Рецепты упорядочены по доле
+        ингредиентов, которые уже есть, затем по числу недостающих.
+        """
+        ingredient_ids = parse_ids(
+            request.query_params.getlist('ingredients'), 'ingredients',
+            'Ожидаются id ингредиентов через запятую.'
+        )
+        if not ingredient_ids:
+            raise ValidationError({'ingredients': ['Укажите ингредиенты.']})
+        if len(ingredient_ids) > MAX_PANTRY_INGREDIENTS:
+            raise ValidationError({'ingredients': [
+                f'Не больше {MAX_PANTRY_INGREDIENTS} ингредиентов.'
+            ]})
+
+        matches = similarity.pantry_recipes(ingredient_ids,
+                                            self._limit(request))
+        rows = self._rows_in_order(
+            [recipe_id for recipe_id, _, _ in matches], request
+        )
+        data = recipes_data(rows, request)
+        counts = {recipe_id: (owned, total)
+                  for recipe_id, owned, total in matches}
+        extra = selected_fields(request, ('coverage', 'missing'))
+        for row, recipe in zip(rows, data):
+            owned, total = counts[row['id']]
+            if 'coverage' in extra:
+                recipe['coverage'] = round(owned / total, 3)
+            if 'missing' in extra:
+                recipe['missing'] = total - owned
+        return Response(data)
+
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    def batch(self, request):
+        """
+        Рецепты по списку id из тела {"ids": [1, 2, 3]} в порядке списка -
+        вариант GET /api/recipes/?ids=1,2,3 для длинных списков.
+        """
+        values = None
+        if hasattr(request.data, 'get'):
+            values = request.data.get('ids')
+        if not isinstance(values, list):
+            values = [] if values is None else [values]
+        ids = batch_recipe_ids(values)
+        return Response(
+            recipes_data(self._rows_in_order(ids, request), request)
+        )
+
+    def _limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', PAGE_SIZE))
+        except ValueError:
+            limit = PAGE_SIZE
+        return min(max(limit, 1), MAX_INDEX_RECIPES)
+
+    def _rows_in_order(self, ids, request):
+        """
+        Строки рецептов в порядке ids. Несуществующие рецепты (в том числе
+        удалённые, но ещё не убранные из индекса) пропускаются.
+        """
+        rows = {
+            row['id']: row
+            for row in Recipe.objects.filter(id__in=ids).values(
+                *recipe_columns(request)
+            )
+        }
+        return [rows[recipe_id] for recipe_id in ids if recipe_id in rows]
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def favorite(self, request, **kwargs):
         """Добавление рецепта в избранное."""
@@ -203,24 +436,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def download_shopping_cart(self, request):
         """Скачивание списка покупок пользователя в виде текстового файла."""
-        ingredients_qs = (
-            IngredientRecipe.objects
-            .filter(recipe__recipe_shopping_carts__user=request.user)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(total_amount=Sum('amount'))
-            .order_by('ingredient__name')
+        shopping_list_text = '\n'.join(
+            shopping_cart_line(ingredient)
+            for ingredient in shopping_cart_ingredients(request.user)
         )
-
-        return self._download_shopping_cart(ingredients_qs)
-
-    def _download_shopping_cart(self, ingredients):
-        lines = [
-            f"{ingredient['ingredient__name']} ({ingredient['ingredient__measurement_unit']}) - {ingredient['total_amount']}"
-            for ingredient in ingredients
-        ]
-
-        shopping_list_text = '\n'.join(lines)
-
         return HttpResponse(shopping_list_text, content_type='text/plain')
 
     def _handle_relation_action(self, request, model, add):
@@ -257,3 +476,106 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     filter_backends = [SearchFilter]
     search_fields = ('^name',)
+
+    def list(self, request, *args, **kwargs):
+        return Response(search_ingredients(
+            SearchFilter().get_search_terms(request)
+        ))
+
+    @action(detail=False, url_path='snapshot')
+    def snapshot(self, request):
+        """Адрес текущей версии полного справочника."""
+        response = redirect(
+            'ingredient-snapshot-version', version=snapshots.current_version()
+        )
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    @action(detail=False, url_path=r'snapshot/(?P<version>[0-9a-f]{16})')
+    def snapshot_version(self, request, version):
+        """
+        Полный справочник в виде готового JSON, сжатые версии тоже готовы.
+
+        Содержимое версии не меняется, поэтому кэшируется навсегда.
+        """
+        bodies = snapshots.get_bodies(version)
+        if bodies is None:
+            raise NotFound()
+        etag = f'"{version}"'
+        # Сжатый ответ получает слабый ETag (см. CompressionMiddleware)
+        if etag in {
+            tag.removeprefix('W/')
+            for tag in parse_etags(request.headers.get('If-None-Match', ''))
+        }:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                bodies[snapshots.IDENTITY], content_type='application/json'
+            )
+            # Кодировку выбирает CompressionMiddleware
+            response.precompressed = bodies
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+class StreamTicketView(APIView):
+    """
+    Билет для GET /api/recipes/stream/?ticket=: EventSource не передаёт
+    заголовок Authorization. Билет одноразовый и действует
+    STREAM_TICKET_SECONDS, перед каждым подключением нужен новый.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({'ticket': events.issue_ticket(request.user.pk)})
+
+
+class SyncView(APIView):
+    """
+    Изменения после токена ?since= (api.sync).
+
+    Без since возвращается только текущий токен: клиент загружает списки
+    обычными запросами и дальше синхронизируется от него.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if since is None:
+            return Response({'token': sync.current_token()})
+        token = sync.parse_token(since)
+        if token is None:
+            raise ValidationError({'since': ['Некорректный токен.']})
+        return Response(sync.changes_since(token, request))
+
+
+class JWTTokenCreateView(TokenCreateView):
+    """
+    Вход в режиме AUTH_MODE=jwt.
+
+    Отвечает в формате djoser token/login ({"auth_token": ...}),
+    поэтому фронтенд продолжает работать без изменений.
+    """
+
+    def _action(self, serializer):
+        user = serializer.user
+        user_logged_in.send(sender=user.__class__,
+                            request=self.request, user=user)
+        refresh = get_jwt_for_user(user)
+        return Response(
+            {
+                'auth_token': str(refresh.access_token),
+                'refresh': str(refresh)
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class JWTTokenRefreshView(TokenRefreshView):
+    """Обновление пары JWT по refresh-токену."""
+
+    serializer_class = JWTRefreshSerializer
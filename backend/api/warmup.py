@@ -0,0 +1,46 @@
+"""Прогрев приложения в мастер-процессе gunicorn перед запуском воркеров."""
+import inspect
+import logging
+
+from django.db import DatabaseError, connections
+from django.urls import get_resolver
+from rest_framework import serializers as drf_serializers
+
+from . import serializers, similarity, snapshots
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """
+    Заполняет ленивые кэши Django и DRF, чтобы воркеры получили их
+    после fork готовыми и первые запросы не платили за инициализацию.
+    """
+    # Разбор всех URL-шаблонов выполняется при первом resolve/reverse
+    get_resolver().reverse_dict
+
+    for _, serializer_class in inspect.getmembers(
+        serializers, inspect.isclass
+    ):
+        if (issubclass(serializer_class, drf_serializers.Serializer)
+                and serializer_class.__module__ == serializers.__name__):
+            serializer_class(context={}).fields
+
+    try:
+        # Снимок справочника ингредиентов: воркеры получают его тела в
+        # памяти и не читают файлы на первых запросах
+        snapshots.get_bodies(snapshots.current_version())
+
+        # Отображения файлов индекса наследуются воркерами вместе с
+        # массивом удалённых строк
+        similarity.get_index()
+    except (DatabaseError, OSError):
+        # Например, миграции ещё не применены: мастер всё равно
+        # запускается, а данные загрузят первые запросы воркеров
+        logger.exception('Снимок и индекс не прогреты')
+
+    # Соединения и пулы нельзя наследовать воркерам через fork
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        if getattr(connection, 'pool', None):
+            connection.close_pool()
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -30,9 +31,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
+    'background.apps.BackgroundConfig',
+    'sync.apps.SyncConfig',
 ]
 
 MIDDLEWARE = [
+    "api.middleware.RequestMetricsMiddleware",
+    "api.middleware.CompressionMiddleware",
+    "api.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -62,16 +68,80 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "backend_foodgram.wsgi.application"
 
+# Под ASGI соединения берутся из пула psycopg: постоянные соединения
+# там не переиспользуются между запросами
+DB_POOL = bool(int(os.getenv('DB_POOL', os.getenv('ASYNC_VIEWS', 0))))
+
+DATABASE = {
+    'ENGINE': 'django.db.backends.postgresql',
+    'NAME': os.getenv('POSTGRES_DB', 'foodgram'),
+    'USER': os.getenv('POSTGRES_USER', 'foodgram_user'),
+    'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'foodgram_password'),
+    'HOST': os.getenv('POSTGRES_DB_HOST', '0.0.0.0'),
+    'PORT': os.getenv('POSTGRES_DB_PORT', 5432),
+    # Пул несовместим с постоянными соединениями
+    'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+    'CONN_HEALTH_CHECKS': bool(int(os.getenv('DB_CONN_HEALTH_CHECKS', 1))),
+    'OPTIONS': {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        },
+    } if DB_POOL else {},
+}
+
 DATABASES = {
+    'default': DATABASE,
+}
+
+# Реплики для чтения: POSTGRES_REPLICA_HOSTS=host1:5432,host2
+REPLICA_DATABASES = []
+for index, address in enumerate(
+    filter(None, os.getenv('POSTGRES_REPLICA_HOSTS', '').split(','))
+):
+    host, _, port = address.strip().partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASE,
+        'HOST': host,
+        'PORT': port or DATABASE['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['api.db_routers.ReplicaRouter']
+
+# Вьюсеты, чьи GET-запросы обслуживаются репликами
+REPLICA_READ_VIEWSETS = [
+    'api.views.RecipeViewSet',
+    'api.views.IngredientViewSet',
+    'api.views.СustomizeUserViewSet',
+]
+
+# Сколько секунд после записи запросы клиента читают с основной БД,
+# чтобы он видел свои изменения несмотря на отставание реплик
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+REPLICA_STICKY_COOKIE = 'db_primary'
+
+# LocMemCache у каждого процесса свой: сброс кэша после изменений и
+# блокировки api.caching действуют между воркерами только с общим
+# кэшем, например django.core.cache.backends.redis.RedisCache
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.getenv('POSTGRES_DB', 'foodgram'),
-        'USER': os.getenv('POSTGRES_USER', 'foodgram_user'),
-        'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'foodgram_password'),
-        'HOST': os.getenv('POSTGRES_DB_HOST', '0.0.0.0'),
-        'PORT': os.getenv('POSTGRES_DB_PORT', 5432)
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
+# С кэшем процесса кэш токенов отключается, а сроки api.caching
+# сокращаются: сброс в одном воркере не виден остальным
+SHARED_CACHE = not CACHES['default']['BACKEND'].endswith('.LocMemCache')
+if not SHARED_CACHE:
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+    }
 
 LOGGING = {
     'version': 1,
@@ -93,10 +163,32 @@ LOGGING = {
         'django.db.backends': {
             'handlers': ['console'],
             'level': 'INFO',
-        }
+        },
+        'api': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
     }
 }
 
+# Допустимое число SQL-запросов на эндпоинт: '<метод> <имя view из urls>'
+QUERY_BUDGETS = {
+    'GET recipe-list': 10,
+    'GET recipe-detail': 10,
+    'GET ingredient-list': 3,
+    'GET user-subscriptions': 8,
+    'GET user-suggestions': 8,
+    'GET sync': 10,
+    'GET recipe-similar': 10,
+    'GET recipe-pantry': 8,
+    'POST recipe-batch': 8,
+}
+# 0 - без ограничения для остальных эндпоинтов
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', 0))
+# 1 - превышение бюджета вызывает исключение (включено в
+# api/tests/test_query_budgets.py)
+QUERY_BUDGET_STRICT = bool(int(os.getenv('QUERY_BUDGET_STRICT', 0)))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -126,17 +218,67 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Ответы меньше этого размера не сжимаются: выигрыш меньше затрат
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSIBLE_CONTENT_TYPES = [
+    'application/json',
+    'text/plain',
+    'text/csv',
+]
+
+# 1 - фоновые задачи выполняются сразу после фиксации транзакции, без
+# воркера run_worker (для разработки)
+BACKGROUND_TASKS_EAGER = bool(int(os.getenv('BACKGROUND_TASKS_EAGER', 0)))
+
+# Готовые снимки справочников (api.snapshots), общие для всех воркеров
+SNAPSHOT_ROOT = os.getenv('SNAPSHOT_ROOT', BASE_DIR / 'snapshots')
+
+# Индексы в файлах, открываемых воркерами через mmap (api.similarity)
+INDEX_ROOT = os.getenv('INDEX_ROOT', BASE_DIR / 'indexes')
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = 'users.User'
 
+# token - токены djoser в БД, jwt - подписанные токены без обращения к БД
+AUTH_MODE = os.getenv('AUTH_MODE', 'token')
+
+AUTHENTICATION_CLASSES = {
+    'token': 'api.authentication.CachedTokenAuthentication',
+    'jwt': 'api.authentication.StatelessJWTAuthentication',
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        AUTHENTICATION_CLASSES[AUTH_MODE],
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'SEARCH_PARAM': 'name',
 }
 
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(
+        minutes=int(os.getenv('JWT_ACCESS_LIFETIME_MINUTES', 15))
+    ),
+    'REFRESH_TOKEN_LIFETIME': timedelta(
+        days=int(os.getenv('JWT_REFRESH_LIFETIME_DAYS', 1))
+    ),
+    'AUTH_HEADER_TYPES': ('Token', 'Bearer'),
+    'UPDATE_LAST_LOGIN': False,
+}
+
+# Асинхронные GET-обработчики ленты, ингредиентов, коротких ссылок и
+# списка покупок; включать при запуске под ASGI (uvicorn)
+ASYNC_VIEWS = bool(int(os.getenv('ASYNC_VIEWS', 0)))
+
 DJOSER = {
     'SERIALIZERS': {
         'user': 'api.serializers.UserDetailSerializer',
@@ -3,13 +3,20 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
-from api.utils import recipe_absolute_uri
+from api import async_views, utils
+from api.metrics import metrics_view
+
+short_link_view = (
+    async_views.recipe_absolute_uri if settings.ASYNC_VIEWS
+    else utils.recipe_absolute_uri
+)
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    path('link/<str:short_link>', recipe_absolute_uri),
+    path('link/<str:short_link>', short_link_view),
+    path('metrics', metrics_view),
 ]
 
 
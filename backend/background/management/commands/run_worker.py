@@ -0,0 +1,42 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from background import queue
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновых задач: выбирает задачи из очереди и выполняет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Задач за одну выборку')
+        parser.add_argument('--interval', type=float, default=1,
+                            help='Пауза, если очередь пуста, секунд')
+        parser.add_argument('--lease', type=int, default=300,
+                            help='Через сколько секунд незавершённую задачу '
+                                 'может забрать другой воркер')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и выйти')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        # Текущая выборка дорабатывает до конца
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        while not self.stopping:
+            close_old_connections()
+            tasks = queue.claim(options['batch_size'], options['lease'])
+            if tasks:
+                queue.run(tasks)
+                self.stdout.write(f'Выполнено задач: {len(tasks)}')
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['interval'])
+
+    def _stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Task",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=200, verbose_name="Задача")),
+                ("payload", models.JSONField(default=dict, verbose_name="Параметры")),
+                (
+                    "key",
+                    models.CharField(
+                        blank=True,
+                        help_text="Пока задача с ключом в очереди, такая же не добавляется",
+                        max_length=255,
+                        null=True,
+                        verbose_name="Ключ",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Ожидает"),
+                            ("running", "Выполняется"),
+                            ("failed", "Ошибка"),
+                        ],
+                        default="pending",
+                        max_length=7,
+                        verbose_name="Статус",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(default=0, verbose_name="Попыток"),
+                ),
+                (
+                    "run_after",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Запуск не раньше",
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(blank=True, verbose_name="Последняя ошибка"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Создана"),
+                ),
+            ],
+            options={
+                "verbose_name": "задача",
+                "verbose_name_plural": "Задачи",
+                "ordering": ("id",),
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_after"], name="task_status_run_after_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("status__in", ["pending", "running"])),
+                        fields=("key",),
+                        name="unique_active_task_key",
+                    )
+                ],
+            },
+        ),
+    ]
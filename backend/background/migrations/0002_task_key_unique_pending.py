@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("background", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="task",
+            name="unique_active_task_key",
+        ),
+        migrations.AlterField(
+            model_name="task",
+            name="key",
+            field=models.CharField(
+                blank=True,
+                help_text="Пока задача с ключом ждёт запуска, такая же не добавляется",
+                max_length=255,
+                null=True,
+                verbose_name="Ключ",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="task",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "pending")),
+                fields=("key",),
+                name="unique_pending_task_key",
+            ),
+        ),
+    ]
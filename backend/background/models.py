@@ -0,0 +1,75 @@
+from django.db import models
+from django.utils import timezone
+
+from constants import LEN_TASK_NAME, LEN_TASK_KEY
+
+
+class Task(models.Model):
+    """Фоновая задача в очереди (см. background.queue)."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Ожидает'
+        RUNNING = 'running', 'Выполняется'
+        FAILED = 'failed', 'Ошибка'
+
+    name = models.CharField(
+        max_length=LEN_TASK_NAME,
+        verbose_name='Задача'
+    )
+    payload = models.JSONField(
+        default=dict,
+        verbose_name='Параметры'
+    )
+    key = models.CharField(
+        max_length=LEN_TASK_KEY,
+        null=True,
+        blank=True,
+        verbose_name='Ключ',
+        help_text=('Пока задача с ключом ждёт запуска, такая же не '
+                   'добавляется')
+    )
+    status = models.CharField(
+        max_length=max(len(value) for value in Status.values),
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    # Для ожидающей задачи - время запуска, для выполняющейся - когда
+    # её можно забрать повторно, если воркер упал
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Запуск не раньше'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создана'
+    )
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'],
+                name='task_status_run_after_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_task_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
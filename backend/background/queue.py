@@ -0,0 +1,195 @@
+"""
+Очередь фоновых задач в таблице БД, без внешних сервисов.
+
+Задача - функция, зарегистрированная декоратором task в модуле tasks
+приложения. Параметры хранятся в JSON. Задачи выполняет команда
+run_worker; после ошибки или падения воркера задача запускается снова,
+поэтому задачи должны быть идемпотентными.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+
+logger = logging.getLogger(__name__)
+
+# Пауза перед повтором: RETRY_DELAY * 2 ** (попытка - 1), не больше
+# MAX_RETRY_DELAY секунд
+RETRY_DELAY = 10
+MAX_RETRY_DELAY = 3600
+
+_registry = {}
+
+
+class TaskSpec:
+    __slots__ = ('func', 'batch', 'max_attempts')
+
+    def __init__(self, func, batch, max_attempts):
+        self.func = func
+        self.batch = batch
+        self.max_attempts = max_attempts
+
+
+def task(name=None, *, batch=False, max_attempts=5):
+    """
+    Регистрирует функцию как фоновую задачу.
+
+    Обычная задача вызывается как func(**payload). Задача с batch=True
+    вызывается один раз на все свои задачи из выборки воркера и получает
+    список payload.
+    """
+    def decorator(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        _registry[func.task_name] = TaskSpec(func, batch, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(func, payload=None, key=None, delay=0):
+    """
+    Ставит задачу в очередь.
+
+    Пока в очереди ждёт запуска задача с тем же key, новая не добавляется.
+    Выполняющаяся задача не в счёт: она могла прочитать данные до
+    изменения, ради которого ставится новая.
+    При BACKGROUND_TASKS_EAGER задача выполняется сразу (без воркера).
+    """
+    name = getattr(func, 'task_name', func)
+    if settings.BACKGROUND_TASKS_EAGER:
+        _call(_registry[name], [payload or {}])
+        return
+    Task.objects.bulk_create(
+        [Task(
+            name=name,
+            payload=payload or {},
+            key=key,
+            run_after=timezone.now() + timedelta(seconds=delay)
+        )],
+        ignore_conflicts=key is not None
+    )
+
+
+def enqueue_many(func, payloads, key=None):
+    """
+    enqueue для списка payload одним INSERT.
+
+    key - функция payload -> ключ задачи или None.
+    """
+    if not payloads:
+        return
+    name = getattr(func, 'task_name', func)
+    if settings.BACKGROUND_TASKS_EAGER:
+        spec = _registry[name]
+        calls = [payloads] if spec.batch else [[item] for item in payloads]
+        for call in calls:
+            _call(spec, call)
+        return
+    now = timezone.now()
+    Task.objects.bulk_create(
+        [Task(name=name, payload=payload,
+              key=key(payload) if key else None, run_after=now)
+         for payload in payloads],
+        ignore_conflicts=key is not None
+    )
+
+
+def enqueue_on_commit(func, payload=None, key=None):
+    """enqueue после фиксации текущей транзакции, сразу - вне транзакции."""
+    transaction.on_commit(partial(enqueue, func, payload, key))
+
+
+def enqueue_many_on_commit(func, payloads, key=None):
+    """enqueue_many после фиксации текущей транзакции."""
+    transaction.on_commit(partial(enqueue_many, func, payloads, key))
+
+
+def claim(batch_size, lease):
+    """
+    Забирает до batch_size готовых задач и продлевает их на lease секунд.
+
+    Выполняющиеся задачи с истёкшим сроком забираются снова: их воркер
+    упал или завис.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(
+                status__in=[Task.Status.PENDING, Task.Status.RUNNING],
+                run_after__lte=now
+            )
+            .order_by('run_after', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        Task.objects.filter(id__in=ids).update(
+            status=Task.Status.RUNNING,
+            run_after=now + timedelta(seconds=lease),
+            attempts=F('attempts') + 1
+        )
+    return list(Task.objects.filter(id__in=ids))
+
+
+def run(tasks):
+    """Выполняет задачи, группируя пакетные по имени."""
+    groups = defaultdict(list)
+    for item in tasks:
+        groups[item.name].append(item)
+
+    for name, group in groups.items():
+        spec = _registry.get(name)
+        if spec is None:
+            _failed(group, f'Задача {name} не зарегистрирована', retry=False)
+            continue
+        calls = [group] if spec.batch else [[item] for item in group]
+        for call in calls:
+            try:
+                _call(spec, [item.payload for item in call])
+            except Exception as error:
+                logger.exception('Ошибка фоновой задачи %s', name)
+                _failed(call, repr(error), retry=True, spec=spec)
+            else:
+                Task.objects.filter(id__in=[item.id for item in call]).delete()
+
+
+def _call(spec, payloads):
+    with transaction.atomic():
+        if spec.batch:
+            spec.func(payloads)
+        else:
+            spec.func(**payloads[0])
+
+
+def _failed(tasks, error, retry, spec=None):
+    now = timezone.now()
+    fields = ['status', 'run_after', 'last_error']
+    keyed = []
+    for item in tasks:
+        if retry and item.attempts < spec.max_attempts:
+            delay = min(RETRY_DELAY * 2 ** (item.attempts - 1),
+                        MAX_RETRY_DELAY)
+            item.status = Task.Status.PENDING
+            item.run_after = now + timedelta(seconds=delay)
+            if item.key is not None:
+                keyed.append(item)
+        else:
+            item.status = Task.Status.FAILED
+        item.last_error = error
+    Task.objects.bulk_update(
+        [item for item in tasks if item not in keyed], fields
+    )
+    for item in keyed:
+        try:
+            with transaction.atomic():
+                item.save(update_fields=fields)
+        except IntegrityError:
+            # Пока задача выполнялась, такую же поставили в очередь
+            # заново - повтор выполнит она
+            item.delete()
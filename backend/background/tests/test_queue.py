@@ -0,0 +1,47 @@
+from django.test import TestCase, override_settings
+
+from background import queue
+from background.models import Task
+
+KEY = 'test:key'
+
+
+@queue.task('background.tests.noop')
+def noop():
+    pass
+
+
+@queue.task('background.tests.fail')
+def fail():
+    raise ValueError('Ошибка')
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=False)
+class KeyDedupeTests(TestCase):
+
+    def _statuses(self):
+        return sorted(Task.objects.filter(key=KEY)
+                      .values_list('status', flat=True))
+
+    def test_pending_task_is_deduplicated(self):
+        queue.enqueue(noop, key=KEY)
+        queue.enqueue(noop, key=KEY)
+        self.assertEqual(self._statuses(), [Task.Status.PENDING])
+
+    def test_running_task_does_not_block_new_one(self):
+        queue.enqueue(noop, key=KEY)
+        queue.claim(10, lease=60)
+        queue.enqueue(noop, key=KEY)
+        self.assertEqual(self._statuses(),
+                         [Task.Status.PENDING, Task.Status.RUNNING])
+
+    def test_failed_task_yields_to_new_pending_one(self):
+        queue.enqueue(fail, key=KEY)
+        tasks = queue.claim(10, lease=60)
+        queue.enqueue(fail, key=KEY)
+
+        queue.run(tasks)
+
+        task = Task.objects.get(key=KEY)
+        self.assertEqual(task.status, Task.Status.PENDING)
+        self.assertEqual(task.attempts, 0)
@@ -10,4 +10,32 @@ LEN_LAST_FIRST_NAME = 150
 LEN_SHORT_LINK = 10
 LEN_INGREDIENT_NAME = 128
 LEN_MEASUREMENT_UNIT = 64
-LEN_RECIPE_NAME = 256
\ No newline at end of file
+LEN_RECIPE_NAME = 256
+TOKEN_AUTH_CACHE_PREFIX = 'auth-token'
+TOKEN_AUTH_CACHE_TIMEOUT = 300
+LEN_TASK_NAME = 200
+LEN_TASK_KEY = 255
+RECIPE_IMAGE_MAX_SIDE = 1600
+MAX_INDEX_RECIPES = 50
+MAX_PANTRY_INGREDIENTS = 200
+SIMILARITY_MAX_DELTA = 10000
+FOLLOW_SUGGESTIONS_PER_USER = 20
+LEN_CHANGE_KIND = 20
+SYNC_MAX_CHANGES = 500
+SYNC_RETENTION_DAYS = 30
+MAX_BATCH_RECIPES = 100
+STREAM_CHANNEL = 'recipe_stream'
+STREAM_QUEUE_SIZE = 100
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_MAX_SECONDS = 900
+STREAM_REPLAY = 100
+STREAM_TICKET_SECONDS = 60
+CACHE_LOCK_SECONDS = 10
+CACHE_WAIT_SECONDS = 0.05
+CACHE_STALE_SECONDS = 60
+CACHE_EARLY_BETA = 1
+# Срок значений api.caching при кэше процесса (SHARED_CACHE выключен)
+LOCAL_CACHE_SECONDS = 5
+RECIPE_CACHE_SECONDS = 300
+INGREDIENT_SEARCH_CACHE_SECONDS = 3600
+SHORT_LINK_CACHE_SECONDS = 86400
@@ -0,0 +1,107 @@
+"""
+Настройки gunicorn, загружаются из рабочего каталога автоматически.
+
+Все параметры переопределяются переменными окружения GUNICORN_*.
+"""
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+CPU_COUNT = multiprocessing.cpu_count()
+
+# sync - процесс на запрос; gthread - потоки внутри процесса, подходят
+# для запросов, ждущих БД; uvicorn - ASGI-воркер для ASYNC_VIEWS=1
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+worker_class = WORKER_CLASSES[os.getenv('GUNICORN_WORKER_CLASS', 'gthread')]
+# Потоки есть только у gthread, остальные классы их не используют
+threads = int(os.getenv(
+    'GUNICORN_THREADS', 4 if worker_class == WORKER_CLASSES['gthread'] else 1
+))
+
+# Соединений с БД на воркер: пул (DB_POOL, как в settings.py) или по
+# одному на поток
+if int(os.getenv('DB_POOL', os.getenv('ASYNC_VIEWS', 0))):
+    connections_per_worker = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+else:
+    connections_per_worker = threads
+# Все воркеры вместе не должны превысить max_connections PostgreSQL
+# (100 по умолчанию) с запасом для фонового воркера, миграций и
+# администрирования; при ручном GUNICORN_WORKERS это на ответственности
+# того, кто его задаёт
+DB_CONNECTIONS = int(os.getenv('GUNICORN_DB_CONNECTIONS', 80))
+max_workers = max(1, DB_CONNECTIONS // connections_per_worker)
+
+if worker_class == WORKER_CLASSES['uvicorn']:
+    wsgi_app = 'backend_foodgram.asgi:application'
+    # Один асинхронный процесс держит много соединений, лишние процессы
+    # только конкурируют за CPU
+    default_workers = CPU_COUNT
+else:
+    wsgi_app = 'backend_foodgram.wsgi:application'
+    default_workers = CPU_COUNT * 2 + 1
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', min(default_workers, max_workers)
+))
+
+# Приложение импортируется в мастере один раз, воркеры получают его
+# через fork (copy-on-write) и стартуют без импорта Django
+preload_app = bool(int(os.getenv('GUNICORN_PRELOAD', 1)))
+
+# Перезапуск воркера после N запросов ограничивает рост памяти;
+# разброс не даёт всем воркерам перезапуститься одновременно
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# Nginx переиспользует соединения с бэкендом
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Heartbeat-файлы воркеров в памяти, а не на overlayfs контейнера
+TMP_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+worker_tmp_dir = TMP_DIR
+
+# Счётчики /metrics воркеры пишут в файлы общего каталога (см.
+# api.metrics); переменная нужна до импорта приложения
+METRICS_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(TMP_DIR, 'foodgram-metrics')
+)
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    """Счётчики прошлого запуска не должны попасть в /metrics."""
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    """Прогрев в мастере: воркеры наследуют готовые кэши."""
+    if not preload_app:
+        return
+
+    from api.warmup import warm_up
+
+    warm_up()
+    # Объекты мастера больше не обходятся сборщиком мусора, и его
+    # проходы в воркерах не копируют общие страницы памяти
+    gc.freeze()
+    server.log.info('Приложение прогрето')
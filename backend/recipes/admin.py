@@ -1,55 +1,100 @@
 from django.contrib import admin
-from django.core.exceptions import ValidationError
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 from .models import (
     Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCart
 )
 
 
+def count_subquery(model, field):
+    """
+    Число строк model, ссылающихся через field на объект строки.
+
+    Подзапрос в SELECT считается только для строк страницы, а JOIN с
+    GROUP BY агрегировал бы всю таблицу до LIMIT.
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('*'))
+            .values('count'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ['name', 'measurement_unit']
     search_fields = ['name']
     ordering = ['name']
+    show_full_result_count = False
 
 
 @admin.register(IngredientRecipe)
 class IngredientRecipeAdmin(admin.ModelAdmin):
     list_display = ['recipe', 'ingredient', 'amount']
     search_fields = ['recipe__name', 'ingredient__name']
+    list_select_related = ['recipe', 'ingredient']
+    autocomplete_fields = ['recipe', 'ingredient']
+    show_full_result_count = False
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ['user', 'recipe']
     search_fields = ['user__username', 'recipe__name']
+    list_select_related = ['user', 'recipe']
+    autocomplete_fields = ['user', 'recipe']
+    show_full_result_count = False
+    # Для -add_time нет отдельного индекса, id растёт вместе с ним
+    ordering = ['-id']
+
+
+class IngredientRecipeInline(admin.TabularInline):
+    model = IngredientRecipe
+    autocomplete_fields = ['ingredient']
+    extra = 0
+    # Рецепт не может быть создан без ингредиентов
+    min_num = 1
+    validate_min = True
+
+    def get_queryset(self, request):
+        # __str__ строки выводится в форме и читает рецепт и ингредиент
+        return super().get_queryset(request).select_related('recipe',
+                                                            'ingredient')
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ['name', 'author']
+    list_display = ['name', 'author', 'favorites_count']
     search_fields = ['name', 'author__username']
-    list_filter = ['author']
-    date_hierarchy = 'pub_date'
-
-    @admin.display(description='Количество добавлений в избранное')
-    def favorites(self, instance):
-        return instance.favorite.count()
+    list_select_related = ['author']
+    autocomplete_fields = ['author']
+    inlines = [IngredientRecipeInline]
+    # date_hierarchy читает все даты таблицы, фильтр периодов - ничего
+    list_filter = ['pub_date']
+    show_full_result_count = False
 
-    def get_form(self, request, obj=None, **kwargs):
-        form = super().get_form(request, obj, **kwargs)
-        if not obj:  # Проверка для создания нового объекта
-            form.base_fields['ingredients'].required = True
-        return form
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorites_count=count_subquery(Favorite, 'recipe')
+        )
 
-    def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
-        if not obj.ingredients.exists() and not change:  # Проверка после сохранения
-            obj.delete()  # Удаляем рецепт, если ингредиентов нет
-            raise ValidationError("Рецепт не может быть создан без ингредиентов.")
+    @admin.display(description='Количество добавлений в избранное',
+                   ordering='favorites_count')
+    def favorites_count(self, instance):
+        return instance.favorites_count
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ['user', 'recipe']
     search_fields = ['user__username', 'recipe__name']
+    list_select_related = ['user', 'recipe']
+    autocomplete_fields = ['user', 'recipe']
+    show_full_result_count = False
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.1 on 2026-10-19 07:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_alter_favorite_recipe_alter_shoppingcart_recipe"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="ingredientrecipe",
+            options={
+                "ordering": ["id"],
+                "verbose_name": "Ингредиенты в рецепте",
+                "verbose_name_plural": "Ингредиенты в рецептах",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="shoppingcart",
+            options={
+                "ordering": ["-id"],
+                "verbose_name": "список покупок",
+                "verbose_name_plural": "Списки покупок",
+            },
+        ),
+        migrations.AlterField(
+            model_name="favorite",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="favorites",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Избранное пользователя",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ingredientrecipe",
+            name="recipe",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="ingredients_in_recipe",
+                to="recipes.recipe",
+                verbose_name="Рецепт",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="recipe",
+            name="author",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="recipes",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Автор рецепта",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(
+                fields=["user", "-add_time"], name="favorite_user_add_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ingredientrecipe",
+            index=models.Index(
+                fields=["recipe"],
+                include=("ingredient", "amount"),
+                name="ingredientrecipe_recipe_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["author", "-pub_date"], name="recipe_author_pub_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-pub_date", "id"], name="recipe_pub_date_id_idx"
+            ),
+        ),
+    ]
@@ -45,6 +45,7 @@ class Recipe(models.Model):
         related_name='recipes',
         verbose_name='Автор рецепта',
         on_delete=models.CASCADE,
+        db_index=False  # покрыт индексом recipe_author_pub_date_idx
     )
 
     name = models.CharField(
@@ -96,6 +97,16 @@ class Recipe(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-pub_date', 'id'],
+                name='recipe_pub_date_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -108,7 +119,8 @@ class IngredientRecipe(models.Model):
         to=Recipe,
         verbose_name='Рецепт',
         on_delete=models.CASCADE,
-        related_name='ingredients_in_recipe'
+        related_name='ingredients_in_recipe',
+        db_index=False  # покрыт индексом ingredientrecipe_recipe_idx
     )
 
     ingredient = models.ForeignKey(
@@ -130,13 +142,20 @@ class IngredientRecipe(models.Model):
     class Meta:
         verbose_name = 'Ингредиенты в рецепте'
         verbose_name_plural = 'Ингредиенты в рецептах'
-        ordering = ['recipe__pub_date']
+        ordering = ['id']
         constraints = [
             models.UniqueConstraint(
                 fields=['ingredient', 'recipe'],
                 name='unique_ingredientrecipe'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe'],
+                include=['ingredient', 'amount'],
+                name='ingredientrecipe_recipe_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.ingredient}, {self.recipe}, {self.amount}'
@@ -150,6 +169,7 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Избранное пользователя',
         on_delete=models.CASCADE,
+        db_index=False  # покрыт индексом favorite_user_add_time_idx
     )
 
     recipe = models.ForeignKey(
@@ -174,6 +194,12 @@ class Favorite(models.Model):
                 name='unique_favorite'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', '-add_time'],
+                name='favorite_user_add_time_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.recipe}, {self.user}'
@@ -199,7 +225,8 @@ class ShoppingCart(models.Model):
     class Meta:
         verbose_name = 'список покупок'
         verbose_name_plural = 'Списки покупок'
-        ordering = ['-recipe__pub_date']
+        # Индекс по user даёт unique_shoppingcart (user, recipe)
+        ordering = ['-id']
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'recipe'],
@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import Change
+
+
+@admin.register(Change)
+class ChangeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'object_id', 'user_id', 'deleted',
+                    'created_at']
+    list_filter = ['kind', 'deleted']
+    readonly_fields = ['kind', 'object_id', 'user', 'deleted', 'created_at']
+    show_full_result_count = False
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from constants import SYNC_RETENTION_DAYS
+from sync.models import Change
+
+
+class Command(BaseCommand):
+    help = ('Удаляет старые записи журнала изменений. Клиенты с токеном '
+            'старше оставшихся записей получат 410 и загрузят данные заново.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=SYNC_RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        latest = Change.objects.order_by('-id').values_list(
+            'id', flat=True
+        ).first()
+        if latest is None:
+            return
+        # Последняя запись остаётся всегда: по ней определяется, что
+        # токен клиента устарел
+        deleted, _ = Change.objects.filter(
+            created_at__lt=timezone.now() - timedelta(days=options['days']),
+            id__lt=latest
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f'Удалено записей: {deleted}'))
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.1 on 2026-10-19 08:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Change",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("recipe", "Рецепт"),
+                            ("favorite", "Избранное"),
+                            ("shopping_cart", "Список покупок"),
+                            ("subscription", "Подписка"),
+                        ],
+                        max_length=20,
+                        verbose_name="Что изменилось",
+                    ),
+                ),
+                (
+                    "object_id",
+                    models.BigIntegerField(verbose_name="id рецепта или автора"),
+                ),
+                ("deleted", models.BooleanField(default=False, verbose_name="Удалено")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, db_index=True, verbose_name="Время"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Владелец",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Изменение",
+                "verbose_name_plural": "Журнал изменений",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(fields=["user", "id"], name="change_user_id_idx")
+                ],
+            },
+        ),
+    ]
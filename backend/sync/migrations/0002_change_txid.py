@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:18
+
+import sync.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sync", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="change",
+            options={
+                "ordering": ["txid", "id"],
+                "verbose_name": "Изменение",
+                "verbose_name_plural": "Журнал изменений",
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="change",
+            name="change_user_id_idx",
+        ),
+        migrations.AddField(
+            model_name="change",
+            name="txid",
+            field=models.BigIntegerField(
+                db_default=sync.models.CurrentTransactionId(),
+                editable=False,
+                verbose_name="Транзакция",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(fields=["txid", "id"], name="change_txid_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(
+                fields=["user", "txid", "id"], name="change_user_txid_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.db import models
+from django.utils.deconstruct import deconstructible
+
+from constants import LEN_CHANGE_KIND
+
+
+@deconstructible(path='sync.models.CurrentTransactionId')
+class CurrentTransactionId(models.Func):
+    """
+    id транзакции, записывающей строку (PostgreSQL 13+). В других БД - 0:
+    SQLite пишет одной транзакцией за раз, и порядок задаёт id.
+    """
+
+    output_field = models.BigIntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return '0', []
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return 'pg_current_xact_id()::text::bigint', []
+
+
+class Change(models.Model):
+    """
+    Запись журнала изменений для GET /api/sync/.
+
+    Токен синхронизации - пара (txid, id) последней отданной записи
+    (см. api.sync). Изменения рецептов общие, у избранного, списка
+    покупок и подписок есть владелец.
+    """
+
+    class Kind(models.TextChoices):
+        RECIPE = 'recipe', 'Рецепт'
+        FAVORITE = 'favorite', 'Избранное'
+        SHOPPING_CART = 'shopping_cart', 'Список покупок'
+        SUBSCRIPTION = 'subscription', 'Подписка'
+
+    kind = models.CharField(
+        max_length=LEN_CHANGE_KIND,
+        choices=Kind.choices,
+        verbose_name='Что изменилось'
+    )
+    object_id = models.BigIntegerField(
+        verbose_name='id рецепта или автора'
+    )
+    # Без внешнего ключа: запись об удалении подписки появляется, пока
+    # каскадно удаляется сам пользователь
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Владелец'
+    )
+    deleted = models.BooleanField(
+        default=False,
+        verbose_name='Удалено'
+    )
+    txid = models.BigIntegerField(
+        db_default=CurrentTransactionId(),
+        editable=False,
+        verbose_name='Транзакция'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Время'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        ordering = ['txid', 'id']
+        indexes = [
+            models.Index(fields=['txid', 'id'], name='change_txid_id_idx'),
+            models.Index(fields=['user', 'txid', 'id'],
+                         name='change_user_txid_id_idx'),
+        ]
+
+    def __str__(self):
+        action = 'удаление' if self.deleted else 'изменение'
+        return f'{self.id}: {action} {self.kind} {self.object_id}'
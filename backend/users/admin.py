@@ -2,29 +2,51 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import Group
 
-from .models import Subscription, User
+from recipes.admin import count_subquery
+from recipes.models import Recipe
+from .models import FollowSuggestion, Subscription, User
 
 
 @admin.register(User)
 class UserAdmin(UserAdmin):
-    list_display = ['first_name', 'last_name', 'username', 'email']
+    list_display = ['first_name', 'last_name', 'username', 'email',
+                    'recipe_count', 'subscriber_count']
     search_fields = ['first_name', 'last_name', 'username', 'email']
+    show_full_result_count = False
 
-    @admin.display(description='Рецепты')
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipe_count=count_subquery(Recipe, 'author'),
+            subscriber_count=count_subquery(Subscription, 'subscribed_to')
+        )
+
+    @admin.display(description='Рецепты', ordering='recipe_count')
     def recipe_count(self, obj):
         """Возвращает количество рецептов, созданных пользователем."""
-        return obj.recipes.count()
+        return obj.recipe_count
 
-    @admin.display(description='Подписчики')
+    @admin.display(description='Подписчики', ordering='subscriber_count')
     def subscriber_count(self, obj):
         """Возвращает количество подписчиков пользователя."""
-        return obj.subscribed_to.count()
+        return obj.subscriber_count
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ['user', 'subscribed_to']
     search_fields = ['user__username', 'subscribed_to__username']
+    list_select_related = ['user', 'subscribed_to']
+    autocomplete_fields = ['user', 'subscribed_to']
+    show_full_result_count = False
+
+
+@admin.register(FollowSuggestion)
+class FollowSuggestionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'suggested', 'score']
+    search_fields = ['user__username']
+    list_select_related = ['user', 'suggested']
+    autocomplete_fields = ['user', 'suggested']
+    show_full_result_count = False
 
 
 admin.site.unregister(Group)
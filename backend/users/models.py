@@ -96,3 +96,37 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f'{self.user}, {self.subscribed_to}'
+
+
+class FollowSuggestion(models.Model):
+    """Рекомендация подписки, рассчитывается пакетно (api.suggestions)."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+        verbose_name='Пользователь'
+    )
+
+    suggested = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggested_to',
+        verbose_name='Рекомендуемый автор'
+    )
+
+    score = models.FloatField(verbose_name='Вес')
+
+    class Meta:
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'suggested'],
+                name='unique_follow_suggestion'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.suggested}'